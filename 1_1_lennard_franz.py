@@ -4,9 +4,21 @@ periodische Randbedingungen
 
 #needed imports
 import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
 import matplotlib.pyplot as plt             #Importe der benötigten Module
 
+try:
+    import numba                            #optional: JIT-Kompilierung
+except ImportError:
+    numba = None
+
+#Verwendetes Backend für die Ensembleberechnung: 'numba' falls vorhanden,
+#sonst die reine NumPy-Umsetzung als Referenz
+BACKEND = 'numba' if numba is not None else 'numpy'
+
 def s_abbildung (theta ,p, K, N):
     """ Funktion zur rekursiven Berechnung der gewählten Werte für Phasenwinkel
     theta ind Impuls p der Standardabbildung. 
@@ -40,15 +52,431 @@ def s_abbildung (theta ,p, K, N):
     return a,b                              #Rückgabe der Arrays
 
 
+def randbedingung(theta, p):
+    """Funktion zur Realisierung der periodischen Randbedingungen.
+    Abbildung von theta auf [0, 2pi) und p auf [-pi, pi)."""
+    return theta % (2.0*np.pi), (p + np.pi) % (2.0*np.pi) - np.pi
+
+
+def _s_abbildung_kern(theta, p, K, erster_block, a, b):
+    """Kern der Standardabbildung für das kompilierte Backend.
+    Füllt die Arrays a und b der Form (M, blocklaenge) Orbit für Orbit und
+    aktualisiert die Zustände theta und p direkt (in-place)."""
+    for k in range(a.shape[0]):
+        th = theta[k]
+        pk = p[k]
+        for j in range(a.shape[1]):
+            if j > 0 or not erster_block:       #Anfangswerte nicht iterieren
+                th = th + pk
+                pk = pk + K*np.sin(th)
+            a[k, j] = th
+            b[k, j] = pk
+        theta[k] = th
+        p[k] = pk
+
+
+if numba is not None:
+    _s_abbildung_kern_jit = numba.njit(cache=True)(_s_abbildung_kern)
+else:
+    _s_abbildung_kern_jit = None
+
+
+def s_abbildung_bloecke(theta, p, K, N, blocklaenge=1000, backend=None):
+    """Generator zur gleichzeitigen Berechnung vieler Orbits der
+    Standardabbildung (Ensemble).
+
+    theta, p: Arrays der Anfangswerte (Länge M = Anzahl der Orbits)
+
+    K: wählbarer Parameter innerhlab der Standardabbildung
+
+    N: Anzahl der Iterationen
+
+    blocklaenge: Anzahl der Iterationen pro Block
+
+    backend: 'numba' (kompiliert) oder 'numpy' (Referenz), ohne Angabe
+             wird BACKEND verwendet
+
+    Es werden nacheinander Blöcke der Form (M, blocklaenge) mit den bereits
+    auf den Torus abgebildeten Werten zurückgegeben (der letzte Block kann
+    kürzer sein). Der erste Block beginnt mit den Anfangswerten, sodass
+    insgesamt N+1 Werte pro Orbit erzeugt werden. Der Speicherbedarf ist
+    damit unabhängig von N."""
+    if backend is None:
+        backend = BACKEND
+    if backend == 'numba' and _s_abbildung_kern_jit is None:
+        raise ValueError("Backend 'numba' nicht verfügbar (numba fehlt)")
+    if backend not in ('numba', 'numpy'):
+        raise ValueError("Unbekanntes Backend: {}".format(backend))
+
+    theta = np.array(theta, dtype=float, ndmin=1)     #Kopie der Anfangswerte
+    p = np.array(p, dtype=float, ndmin=1)
+
+    i = 0                                   #Anzahl bereits erzeugter Werte
+    while i < N+1:
+        laenge = min(blocklaenge, N+1-i)
+
+        if backend == 'numba':
+            a = np.empty((len(theta), laenge))
+            b = np.empty((len(p), laenge))
+            _s_abbildung_kern_jit(theta, p, K, i == 0, a, b)
+        else:
+            a = np.empty((laenge, len(theta)))  #zeilenweises Füllen ist
+            b = np.empty((laenge, len(p)))      #schneller, daher später .T
+
+            for j in range(laenge):
+                if i+j > 0:                     #Anfangswerte nicht iterieren
+                    theta = theta + p           #gleiche Rekursion wie in
+                    p = p + K*np.sin(theta)     #s_abbildung, jedoch für alle
+                                                #Orbits gleichzeitig
+                a[j] = theta
+                b[j] = p
+            a = a.T
+            b = b.T
+
+        i += laenge
+        yield randbedingung(a, b)
+
+
+def s_abbildung_ensemble(theta, p, K, N, backend=None):
+    """Funktion zur gleichzeitigen Berechnung vieler Orbits der
+    Standardabbildung. Analog zu s_abbildung, jedoch für Arrays von
+    Anfangswerten theta und p.
+
+    backend: siehe s_abbildung_bloecke
+
+    Rückgabe: zwei Arrays der Form (Anzahl Orbits, N+1) für theta und p"""
+    bloecke = list(s_abbildung_bloecke(theta, p, K, N, backend=backend))
+    a = np.concatenate([block[0] for block in bloecke], axis=1)
+    b = np.concatenate([block[1] for block in bloecke], axis=1)
+    return a, b
+
+
+def _lyapunov_kern(theta, p, K, N, lyapunov):
+    """Kern der Lyapunov-Berechnung für das kompilierte Backend
+    (Rechnung wie in lyapunov_exponent, jedoch Orbit für Orbit)."""
+    for k in range(theta.shape[0]):
+        th = theta[k]
+        pk = p[k]
+        d_th = 1.0
+        d_p = 0.0
+        summe = 0.0
+        for i in range(N):
+            th = th + pk
+            pk = pk + K*np.sin(th)
+            d_th = d_th + d_p
+            d_p = d_p + K*np.cos(th)*d_th
+            norm = np.sqrt(d_th**2 + d_p**2)
+            summe += np.log(norm)
+            d_th /= norm
+            d_p /= norm
+        lyapunov[k] = summe/N
+
+
+if numba is not None:
+    _lyapunov_kern_jit = numba.njit(cache=True)(_lyapunov_kern)
+else:
+    _lyapunov_kern_jit = None
+
+
+def lyapunov_exponent(theta, p, K, N, backend=None):
+    """Funktion zur Berechnung des maximalen Lyapunov-Exponenten für
+    endliche Zeiten für viele Orbits gleichzeitig.
+
+    Neben dem Orbit wird ein Tangentialvektor (d_theta, d_p) mit der
+    linearisierten Standardabbildung (Tangentialabbildung)
+        d_theta' = d_theta + d_p
+        d_p'     = d_p + K*cos(theta')*d_theta'
+    iteriert und nach jedem Schritt normiert. Der Mittelwert der
+    logarithmierten Normen ergibt den Lyapunov-Exponenten.
+
+    theta, p: Arrays der Anfangswerte
+
+    K, N: Parameter und Anzahl der Iterationen wie in s_abbildung
+
+    backend: siehe s_abbildung_bloecke
+
+    Rückgabe: Array der Lyapunov-Exponenten (reguläre Orbits ~0,
+              chaotische Orbits >0)"""
+    if backend is None:
+        backend = BACKEND
+    if backend == 'numba' and _lyapunov_kern_jit is None:
+        raise ValueError("Backend 'numba' nicht verfügbar (numba fehlt)")
+    if backend not in ('numba', 'numpy'):
+        raise ValueError("Unbekanntes Backend: {}".format(backend))
+
+    theta = np.array(theta, dtype=float, ndmin=1)     #Kopie der Anfangswerte
+    p = np.array(p, dtype=float, ndmin=1)
+
+    if backend == 'numba':
+        lyapunov = np.empty(len(theta))
+        _lyapunov_kern_jit(theta, p, K, N, lyapunov)
+        return lyapunov
+
+    d_theta = np.ones_like(theta)                   #Starttangentialvektor
+    d_p = np.zeros_like(p)
+    summe = np.zeros_like(theta)
+
+    for i in range(N):
+        theta = theta + p
+        p = p + K*np.sin(theta)
+        d_theta = d_theta + d_p
+        d_p = d_p + K*np.cos(theta)*d_theta
+
+        norm = np.hypot(d_theta, d_p)
+        summe += np.log(norm)                   #Aufsummieren der Streckung
+        d_theta /= norm                         #Normierung verhindert
+        d_p /= norm                             #Überlauf
+
+    return summe/N
+
+
+def chaoskarte(K, N, aufloesung=(200, 200), schwelle=0.05, backend=None):
+    """Funktion zur Klassifikation eines ganzen Gitters von Anfangswerten
+    (theta, p) als regulär oder chaotisch mithilfe des Lyapunov-Exponenten.
+
+    K, N: Parameter und Anzahl der Iterationen
+
+    aufloesung: Anzahl der Gitterpunkte in theta- und p-Richtung
+
+    schwelle: Lyapunov-Exponenten oberhalb der Schwelle gelten als chaotisch
+              (für reguläre Orbits fällt der Exponent etwa wie log(N)/N)
+
+    Rückgabe: Lyapunov-Exponenten und Klassifikation (True = chaotisch) als
+              Arrays der Form aufloesung sowie der chaotische Anteil"""
+    theta = np.linspace(0, 2*np.pi, aufloesung[0], endpoint=False)
+    p = np.linspace(-np.pi, np.pi, aufloesung[1], endpoint=False)
+    theta_mesh, p_mesh = np.meshgrid(theta, p, indexing='ij')
 
+    lyapunov = lyapunov_exponent(theta_mesh.ravel(), p_mesh.ravel(), K, N,
+                                 backend).reshape(aufloesung)
+    chaotisch = lyapunov > schwelle
+    return lyapunov, chaotisch, np.mean(chaotisch)
 
-def wenn_maus_geklickt(event,ax, K, N):
-    """Verwendung der gegebenen Funktion"""
+
+def histogramm_hinzufuegen(histogramm, theta, p):
+    """Funktion zum Einsortieren von Werten (theta, p) auf dem Torus in ein
+    bestehendes 2D-Histogramm der Form (Anzahl theta-Bins, Anzahl p-Bins).
+    Das Histogramm wird direkt verändert (in-place) und zurückgegeben."""
+    n_theta, n_p = histogramm.shape
+    #Berechnung der Bin-Indices, min() fängt Rundung auf den Rand ab
+    i = np.minimum((np.ravel(theta)*(n_theta/(2.0*np.pi))).astype(np.intp),
+                   n_theta - 1)
+    j = np.minimum(((np.ravel(p) + np.pi)*(n_p/(2.0*np.pi))).astype(np.intp),
+                   n_p - 1)
+    histogramm += np.bincount(i*n_p + j,
+                              minlength=n_theta*n_p).reshape(n_theta, n_p)
+    return histogramm
+
+
+def histogramme_zusammenfuehren(histogramme):
+    """Funktion zum Zusammenführen von Teilhistogrammen (z.B. verschiedener
+    Prozesse) gleicher Auflösung durch Summation."""
+    histogramme = list(histogramme)
+    gesamt = np.zeros(histogramme[0].shape, dtype=np.int64)
+    for histogramm in histogramme:
+        if histogramm.shape != gesamt.shape:
+            raise ValueError("Histogramme unterschiedlicher Auflösung")
+        gesamt += histogramm
+    return gesamt
+
+
+def phasenraum_dichte(theta, p, K, N, aufloesung=(200, 200),
+                      orbits_pro_block=10000, blocklaenge=100, backend=None):
+    """Funktion zur Berechnung der Phasenraumdichte der Standardabbildung
+    als 2D-Histogramm über den Torus [0, 2pi) x [-pi, pi).
+
+    theta, p: Arrays der Anfangswerte
+
+    K, N: Parameter und Anzahl der Iterationen wie in s_abbildung
+
+    aufloesung: Anzahl der Bins in theta- und p-Richtung
+
+    orbits_pro_block, blocklaenge: Größe der gleichzeitig gehaltenen
+    Blöcke. Es werden nie vollständige Trajektorien gespeichert, der
+    Speicherbedarf ist durch orbits_pro_block*blocklaenge begrenzt.
+
+    Rückgabe: Histogramm (Anzahl der Iterierten pro Bin) der Form
+              aufloesung"""
+    theta = np.ravel(theta)
+    p = np.ravel(p)
+    histogramm = np.zeros(aufloesung, dtype=np.int64)
+
+    for start in range(0, len(theta), orbits_pro_block):
+        stop = start + orbits_pro_block
+        for a, b in s_abbildung_bloecke(theta[start:stop], p[start:stop], K,
+                                        N, blocklaenge, backend):
+            histogramm_hinzufuegen(histogramm, a, b)
+
+    return histogramm
+
+
+def k_sweep_datei(verzeichnis, K):
+    """Funktion zur Bestimmung des Dateinamens der Ergebnisse für ein K"""
+    return os.path.join(verzeichnis, "K_{:.6f}.npz".format(K))
+
+
+#Mindestanzahl an Punkten pro Bin für die Abschätzung des chaotischen 
+#Anteils in k_sweep_einzeln
+PUNKTE_PRO_BIN = 5
+
+
+def k_sweep_einzeln(K, verzeichnis, M, N, aufloesung, seed):
+    """Funktion zur Berechnung und Speicherung der Ergebnisse für ein
+    einzelnes K (wird von k_sweep in einem eigenen Prozess aufgerufen).
+
+    Es werden M zufällige, gleichverteilte Anfangswerte auf dem Torus
+    gewählt und das Histogramm der Iterierten gespeichert.
+    Zur groben Abschätzung des chaotischen Anteils des Phasenraums werden
+    zusätzlich M/100 Orbits nahe des hyperbolischen Fixpunkts (0,0)
+    gestartet, welcher in der chaotischen See liegt, und der Anteil der von
+    diesen Orbits besuchten Bins bestimmt. Damit dieser Anteil nicht von
+    der Stichprobengröße abhängt, werden mindestens so viele Orbits
+    gestartet, dass im Mittel PUNKTE_PRO_BIN Punkte auf jeden Bin 
+    entfallen, und durch den Anteil 1-(1-1/Bins)**n geteilt, den eine 
+    gleichverteilte Stichprobe mit ebenso vielen Punkten n erreicht.
+    Die Datei wird erst unter temporärem Namen geschrieben und dann
+    umbenannt, sodass nach einem Abbruch keine unvollständigen Ergebnisse
+    vorliegen.
+    Außerdem wird der chaotische Anteil aus chaoskarte auf einem Gitter
+    von 100x100 Anfangswerten gespeichert."""
+    rng = np.random.default_rng([seed, int(round(K*1e6))])
+    theta_0 = rng.uniform(0, 2*np.pi, M)
+    p_0 = rng.uniform(-np.pi, np.pi, M)
+    histogramm = phasenraum_dichte(theta_0, p_0, K, N, aufloesung)
+
+    M_chaos = max(M//100, int(np.ceil(PUNKTE_PRO_BIN*histogramm.size/N)))
+    theta_0 = rng.uniform(0, 1e-3, M_chaos)
+    p_0 = rng.uniform(-1e-3, 1e-3, M_chaos)
+    histogramm_chaos = phasenraum_dichte(theta_0, p_0, K, N, aufloesung)
+    abdeckung = -np.expm1(histogramm_chaos.sum()
+                          *np.log1p(-1.0/histogramm.size))
+    chaotischer_anteil = min(np.count_nonzero(histogramm_chaos)
+                             /(histogramm.size*abdeckung), 1.0)
+
+    #Vergleichswert aus Lyapunov-Exponenten auf einem groben Gitter
+    lyapunov_anteil = chaoskarte(K, N, (100, 100))[2]
+
+    datei = k_sweep_datei(verzeichnis, K)
+    temp = datei + ".tmp.npz"
+    np.savez_compressed(temp, K=K, M=M, N=N, histogramm=histogramm,
+                        chaotischer_anteil=chaotischer_anteil,
+                        lyapunov_anteil=lyapunov_anteil)
+    os.replace(temp, datei)
+    return datei
+
+
+def k_sweep(K_werte, verzeichnis, M=100000, N=1000, aufloesung=(200, 200),
+            prozesse=None, seed=0):
+    """Funktion zur Berechnung der Standardabbildung für viele Werte von K
+    auf mehreren Prozessen (Batchbetrieb ohne Plotfenster).
+
+    K_werte: Array der zu berechnenden Parameter K
+
+    verzeichnis: Ausgabeverzeichnis, pro K wird eine Datei K_<K>.npz mit
+                 Histogramm und geschätzten chaotischen Anteilen geschrieben
+
+    M, N: Anzahl der Orbits pro K und Anzahl der Iterationen
+
+    aufloesung: Auflösung des Histogramms
+
+    prozesse: Anzahl der Prozesse (ohne Angabe Anzahl der CPU-Kerne)
+
+    seed: Startwert des Zufallsgenerators (pro K reproduzierbar)
+
+    Bereits vorhandene Ergebnisdateien werden übersprungen, sodass ein
+    abgebrochener Sweep einfach erneut gestartet werden kann.
+
+    Rückgabe: Liste der Ergebnisdateien in der Reihenfolge von K_werte"""
+    os.makedirs(verzeichnis, exist_ok=True)
+    offen = [K for K in K_werte
+             if not os.path.exists(k_sweep_datei(verzeichnis, K))]
+    print("K-Sweep: {} von {} Werten bereits berechnet".format(
+        len(K_werte) - len(offen), len(K_werte)))
+
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        auftraege = [pool.submit(k_sweep_einzeln, K, verzeichnis, M, N,
+                                 aufloesung, seed) for K in offen]
+        for i, auftrag in enumerate(as_completed(auftraege)):
+            print("{}/{} fertig: {}".format(i+1, len(offen),
+                                            auftrag.result()))
+
+    return [k_sweep_datei(verzeichnis, K) for K in K_werte]
+
+
+def k_sweep_laden(dateien):
+    """Funktion zum Einlesen der Ergebnisse von k_sweep.
+    Rückgabe: Arrays für K, chaotischen Anteil (Bedeckung und Lyapunov)
+              und Histogramme"""
+    K = []
+    chaotischer_anteil = []
+    lyapunov_anteil = []
+    histogramme = []
+    for datei in dateien:
+        with np.load(datei) as daten:
+            K.append(float(daten["K"]))
+            chaotischer_anteil.append(float(daten["chaotischer_anteil"]))
+            lyapunov_anteil.append(float(daten["lyapunov_anteil"]))
+            histogramme.append(daten["histogramm"])
+    return (np.array(K), np.array(chaotischer_anteil),
+            np.array(lyapunov_anteil), np.array(histogramme))
+
+
+def paritaetstest(K_werte=(2.6, 6.0), M=1000, N=20, toleranz=1e-8):
+    """Vergleich des kompilierten Backends mit der Referenz s_abbildung
+    im chaotischen Bereich.
+
+    Da sich Rundungsunterschiede der Sinusfunktion im chaotischen Bereich
+    exponentiell verstärken, wird nur über wenige Iterationen N verglichen.
+    Der Abstand wird auf dem Torus gemessen, damit Werte nahe der Ränder
+    nicht als Abweichung von 2pi gezählt werden.
+
+    Rückgabe: maximale Abweichung, bei Überschreitung der Toleranz wird ein
+              AssertionError ausgelöst"""
+    backends = ['numpy'] + (['numba'] if numba is not None else [])
+    rng = np.random.default_rng(0)
+    max_abweichung = 0.0
+
+    for K in K_werte:
+        theta_0 = rng.uniform(0, 2*np.pi, M)
+        p_0 = rng.uniform(-np.pi, np.pi, M)
+        referenz = [s_abbildung(theta_0[k], p_0[k], K, N) for k in range(M)]
+        a_ref = np.array([r[0] for r in referenz])
+        b_ref = np.array([r[1] for r in referenz])
+
+        for backend in backends:
+            a, b = s_abbildung_ensemble(theta_0, p_0, K, N, backend=backend)
+            #Abstand auf dem Torus (Differenz auf [-pi, pi) abgebildet)
+            d_a = np.abs((a - a_ref + np.pi) % (2.0*np.pi) - np.pi)
+            d_b = np.abs((b - b_ref + np.pi) % (2.0*np.pi) - np.pi)
+            abweichung = max(d_a.max(), d_b.max())
+            assert abweichung < toleranz, \
+                "K={}, Backend {}: Abweichung {}".format(K, backend,
+                                                          abweichung)
+            max_abweichung = max(max_abweichung, abweichung)
+
+    return max_abweichung
+
+
+def wenn_maus_geklickt(event,ax, K, N, histogramm=None, bild=None):
+    """Verwendung der gegebenen Funktion
+
+    histogramm, bild: optional, bei Angabe werden die Iterierten nicht als
+    Punkte geplottet, sondern in das Histogramm einsortiert und das
+    Dichtebild (imshow) aktualisiert."""
     # Test, ob Klick mit linker Maustaste und im Koordinatensystem
     # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
     mode = event.canvas.toolbar.mode
     if event.button == 1 and event.inaxes and mode == '':
-        x, y = s_abbildung(event.xdata, event.ydata, K, N)
+        if histogramm is not None:
+            histogramm += phasenraum_dichte(event.xdata, event.ydata, K, N,
+                                            aufloesung=histogramm.shape)
+            bild.set_data(np.log1p(histogramm.T))     #log. Farbskala
+            bild.autoscale()
+            event.canvas.draw()
+            return
+
+        a, b = s_abbildung_ensemble(event.xdata, event.ydata, K, N)
+        x, y = a[0], b[0]                   #nur ein Orbit pro Klick
         
         ax.plot(x, y, linestyle='None', marker= '.', markersize=3)
         # Fensterbereich aktualisieren
@@ -60,6 +488,8 @@ def main():
     """Hauptprogramm: Initialisierung Plotfenster + Def. Mausinteraktion."""
     K = 2.6    #gegebener Parameter
     N = 1000   #gegebene Anzahl an Iterationen 
+    dichtedarstellung = True   #Dichtebild statt einzelner Punkte
+    aufloesung = (200, 200)    #Anzahl Bins des Dichtebilds (theta, p)
 
     # Nutzerfuehrung und Parameterausgabe
     print(__doc__)
@@ -82,10 +512,20 @@ def main():
             [ r'$0$',r'$\pi$', r'$2\pi$'])
     plt.yticks( [-np.pi, 0,np.pi],
             [r'$-\pi$',r'$0$',r'$\pi$']) #Achsenenteilung und -beschriftung
+
+    #Leeres Histogramm und Dichtebild, welche bei jedem Klick ergänzt werden
+    histogramm = None
+    bild = None
+    if dichtedarstellung:
+        histogramm = np.zeros(aufloesung, dtype=np.int64)
+        bild = ax.imshow(histogramm.T, origin='lower', aspect='auto',
+                         extent=[0, 2*np.pi, -np.pi, np.pi], cmap='viridis',
+                         interpolation='nearest')
             
     #Bei Mausklick werden an Funktion s_abbildung Startwerte 
     #für Phi und p, sowie der Plotbereich ax übergeben und geplottet.  
-    klick_funktion = functools.partial(wenn_maus_geklickt, ax=ax, K=K, N=N) 
+    klick_funktion = functools.partial(wenn_maus_geklickt, ax=ax, K=K, N=N,
+                                       histogramm=histogramm, bild=bild) 
                                        
     fig.canvas.mpl_connect('button_press_event', klick_funktion)
     
@@ -94,7 +534,17 @@ def main():
     
 
 if __name__ == "__main__":
-    main()
+    #Batchbetrieb: python 1_1_lennard_franz.py sweep <Ausgabeverzeichnis>
+    #berechnet K von 0 bis 7 in Schritten von 0.01 ohne Plotfenster
+    if len(sys.argv) > 2 and sys.argv[1] == "sweep":
+        k_sweep(np.round(np.linspace(0.0, 7.0, 701), 6), sys.argv[2])
+    #Vergleich der Backends mit der Referenz: python 1_1_lennard_franz.py 
+    #paritaet
+    elif len(sys.argv) > 1 and sys.argv[1] == "paritaet":
+        print("Backend {}: maximale Abweichung {:.2e}".format(
+            BACKEND, paritaetstest()))
+    else:
+        main()
    
 #Bei K=0 ergeben sich horizontale Linien.
 
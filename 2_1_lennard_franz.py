@@ -2,6 +2,8 @@
 mithilfe verschiedener Methoden. Explizite Darstellung der Ableitung Funktion
 arctan(x**2) an der Stelle 1/3 im Bereich für h von 1e-10 bis 1"""
 
+import sys
+import time
 import numpy as np
 import matplotlib.pyplot as plt  
 #Importe
@@ -34,6 +36,243 @@ def ableitung_E(funktion, x_0, h):
     für gegebenes h """
     return 1/(3*h)*(8*(funktion(x_0+h/4)-funktion(x_0-h/4))-
                (funktion(x_0+h/2)-funktion(x_0-h/2)))
+
+
+def ableitung_K(funktion, x_0, h):
+    """Funktion zur Berechnung des Werts der ersten Ableitung mit 
+    komplexem Schritt (complex step) einer Funktion an der Stelle x_0 für 
+    gegebenes h. Die Funktion muss für komplexe Argumente definiert sein.
+    Da keine Differenz gebildet wird, tritt keine Auslöschung auf und h 
+    kann beliebig klein (z.B. 1e-200) gewählt werden."""
+    return np.imag(funktion(x_0 + 1j*h))/h
+
+
+class Dual:
+    """Duale Zahl wert + ableitung*eps mit eps**2 = 0 zur automatischen 
+    Differenziation (Vorwärtsmodus). wert und ableitung können Zahlen oder
+    Arrays sein. Die gängigen NumPy-Funktionen werden über 
+    __array_ufunc__ unterstützt."""
+    
+    #Ableitungen der unterstützten einstelligen NumPy-Funktionen
+    ABLEITUNGEN = {
+        np.sin: np.cos,
+        np.cos: lambda x: -np.sin(x),
+        np.tan: lambda x: 1/np.cos(x)**2,
+        np.arctan: lambda x: 1/(1 + x**2),
+        np.exp: np.exp,
+        np.log: lambda x: 1/x,
+        np.sqrt: lambda x: 0.5/np.sqrt(x),
+        np.sinh: np.cosh,
+        np.cosh: np.sinh,
+        np.tanh: lambda x: 1/np.cosh(x)**2,
+        np.sign: np.zeros_like,
+        np.absolute: np.sign,
+    }
+    
+    #zweistellige NumPy-Funktionen und zugehörige Rechenoperation
+    OPERATIONEN = {
+        np.add: lambda a, b: a + b,
+        np.subtract: lambda a, b: a - b,
+        np.multiply: lambda a, b: a * b,
+        np.true_divide: lambda a, b: a / b,
+        np.power: lambda a, b: a ** b,
+    }
+    
+    def __init__(self, wert, ableitung):
+        self.wert = wert
+        self.ableitung = ableitung
+    
+    @staticmethod
+    def _dual(x):
+        return x if isinstance(x, Dual) else Dual(x, 0.0)
+    
+    def __add__(self, other):
+        other = Dual._dual(other)
+        return Dual(self.wert + other.wert, self.ableitung + other.ableitung)
+    
+    __radd__ = __add__
+    
+    def __sub__(self, other):
+        other = Dual._dual(other)
+        return Dual(self.wert - other.wert, self.ableitung - other.ableitung)
+    
+    def __rsub__(self, other):
+        return Dual._dual(other) - self
+    
+    def __mul__(self, other):
+        other = Dual._dual(other)
+        return Dual(self.wert*other.wert, 
+                    self.ableitung*other.wert + self.wert*other.ableitung)
+    
+    __rmul__ = __mul__
+    
+    def __truediv__(self, other):
+        other = Dual._dual(other)
+        return Dual(self.wert/other.wert, 
+                    (self.ableitung*other.wert - self.wert*other.ableitung)
+                    /other.wert**2)
+    
+    def __rtruediv__(self, other):
+        return Dual._dual(other) / self
+    
+    def __neg__(self):
+        return Dual(-self.wert, -self.ableitung)
+    
+    def __abs__(self):
+        return np.absolute(self)
+    
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            return np.exp(other*np.log(self))
+        #Potenz mit konstantem Exponenten
+        return Dual(self.wert**other, 
+                    other*self.wert**(other - 1)*self.ableitung)
+    
+    def __rpow__(self, other):
+        return np.exp(self*np.log(other))
+    
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs:
+            return NotImplemented
+        if ufunc in Dual.OPERATIONEN and len(inputs) == 2:
+            return Dual.OPERATIONEN[ufunc](Dual._dual(inputs[0]), inputs[1])
+        if ufunc is np.negative:
+            return -inputs[0]
+        if ufunc in Dual.ABLEITUNGEN:
+            x = inputs[0]
+            return Dual(ufunc(x.wert), 
+                        Dual.ABLEITUNGEN[ufunc](x.wert)*x.ableitung)
+        return NotImplemented
+
+
+def ableitung_D(funktion, x_0, h):
+    """Funktion zur Berechnung des Werts der ersten Ableitung mit 
+    automatischer Differenziation (duale Zahlen) einer Funktion an der 
+    Stelle x_0. Die Ableitung ist bis auf Rundungsfehler exakt, h wird 
+    nicht benötigt und nur für die gleiche Aufrufform wie ableitung_V, 
+    ableitung_Z und ableitung_E übergeben (das Ergebnis hat die Form von
+    x_0 und h)."""
+    x_0, h = np.broadcast_arrays(np.asarray(x_0, dtype=float), h)
+    return funktion(Dual(x_0, np.ones_like(x_0))).ableitung
+
+
+def benchmark(x_0=None, wiederholungen=20):
+    """Vergleich der Methoden zur numerischen Differenziation bezüglich
+    Rechenzeit pro Ableitung und relativem Fehler. Für die 
+    Differenzenformeln werden die abgelesenen optimalen Schrittweiten 
+    verwendet (siehe Kommentare am Ende der Datei)."""
+    if x_0 is None:
+        x_0 = np.linspace(0.1, 2.0, 100000)
+    dYdx = dfunktion(x_0)
+    
+    methoden = [('Vorwärtsdifferenz', ableitung_V, 1.2e-08),
+                ('Zentraldifferenz', ableitung_Z, 1.5e-05),
+                ('Extrapolierte Differenz', ableitung_E, 2.5e-03),
+                ('Komplexer Schritt', ableitung_K, 1e-200),
+                ('Duale Zahlen', ableitung_D, 0.0)]
+    
+    print("{:<25}{:>15}{:>15}{:>15}".format("Methode", "Zeit/Abl. [s]", 
+                                            "max. rel. F.", "med. rel. F."))
+    for name, methode, h in methoden:
+        start = time.perf_counter()
+        for i in range(wiederholungen):
+            dydx = methode(funktion, x_0, h)
+        zeit = (time.perf_counter() - start)/(wiederholungen*np.size(x_0))
+        fehler = relativer_fehler(dydx, dYdx)
+        print("{:<25}{:>15.2e}{:>15.2e}{:>15.2e}".format(
+            name, zeit, np.max(fehler), np.median(fehler)))
+
+
+def ableitungen_gemeinsam(funktion, x_0, h):
+    """Funktion zur gemeinsamen Berechnung der ersten Ableitung mit 
+    Vorwärts-, Zentral- und Extrapolierter Differenz für Arrays von 
+    Stellen x_0 und Schrittweiten h.
+    
+    Die Stützstellen aller drei Methoden (x_0, x_0+h, x_0+-h/2, x_0+-h/4)
+    werden für alle Kombinationen von x_0 und h zusammengefasst, doppelte
+    Stützstellen entfernt und funktion nur einmal auf dieser Menge 
+    ausgewertet. Die Ableitungen werden aus den gemeinsamen Werten 
+    zusammengesetzt und stimmen mit ableitung_V, ableitung_Z und 
+    ableitung_E überein.
+    
+    Rückgabe: Ableitungen (Vorwärts, Zentral, Extrapoliert) jeweils als 
+              Array der Form x_0.shape + h.shape und die Anzahl der 
+              Funktionsauswertungen"""
+    x_0 = np.asarray(x_0, dtype=float)
+    h = np.asarray(h, dtype=float)
+    form = x_0.shape + h.shape
+    
+    #Stützstellen aller Methoden für jede Kombination (x_0, h)
+    x = x_0.reshape(x_0.shape + (1,)*h.ndim)
+    stuetzstellen = np.stack([x+0*h, x+h, x+h/2, x-h/2, x+h/4, x-h/4])
+    
+    #einmalige Auswertung der Funktion auf den verschiedenen Stützstellen
+    x_einzeln, index = np.unique(stuetzstellen, return_inverse=True)
+    f = funktion(x_einzeln)[index].reshape((6,) + form)
+    
+    dydx_V = 1/h * (f[1]-f[0])
+    dydx_Z = 1/h*(f[2]-f[3])
+    dydx_E = 1/(3*h)*(8*(f[4]-f[5])-(f[2]-f[3]))
+    return dydx_V, dydx_Z, dydx_E, len(x_einzeln)
+
+
+def ableitung_richardson(funktion, x_0, h_0=0.1, faktor=1.4, zeilen=10,
+                         methode=ableitung_Z, ordnung=2, min_zeilen=5):
+    """Funktion zur Berechnung der ersten Ableitung mit automatischer Wahl
+    der Schrittweite mithilfe eines Richardson-Tableaus (Verfahren nach 
+    Ridders).
+    
+    Die Differenzenformel (methode) wird für die Schrittweiten 
+    h_0, h_0/faktor, h_0/faktor**2, ... ausgewertet und durch 
+    Richardson-Extrapolation schrittweise verbessert. Für jede Stelle wird
+    der Eintrag des Tableaus mit der kleinsten Fehlerabschätzung gewählt.
+    Sobald der Fehler durch Auslöschung wieder deutlich ansteigt, wird die
+    Iteration für diese Stelle beendet, frühestens jedoch nach min_zeilen
+    Zeilen (in den ersten Zeilen ist die Fehlerabschätzung noch zu grob, 
+    ein zufällig kleiner Fehler würde sonst zu früh abbrechen).
+    
+    x_0: Stelle oder Array von Stellen
+    h_0: größte verwendete Schrittweite
+    zeilen: maximale Anzahl Zeilen des Tableaus, die Anzahl der 
+            Funktionsauswertungen ist damit auf 2*zeilen (ableitung_Z) 
+            bzw. 4*zeilen (ableitung_E) begrenzt
+    methode, ordnung: Differenzenformel und deren Fehlerordnung in h
+                      (ableitung_Z: 2, ableitung_E: 4)
+    min_zeilen: Mindestanzahl an Zeilen vor einem Abbruch
+    
+    Rückgabe: Ableitung, Fehlerabschätzung und verwendete Schrittweite 
+              (kleinste Schrittweite des gewählten Eintrags)"""
+    x_0 = np.asarray(x_0, dtype=float)
+    
+    ergebnis = np.zeros(x_0.shape)
+    fehler = np.full(x_0.shape, np.inf)
+    h_opt = np.zeros(x_0.shape)
+    aktiv = np.ones(x_0.shape, dtype=bool)
+    
+    h = h_0
+    zeile = [methode(funktion, x_0, h)]
+    for i in range(1, zeilen):
+        h = h/faktor
+        neue_zeile = [methode(funktion, x_0, h)]
+        for j in range(1, i+1):
+            #Elimination des Fehlerterms der Ordnung ordnung+2*(j-1)
+            fak = faktor**(ordnung + 2*(j-1))
+            neue_zeile.append((fak*neue_zeile[j-1] - zeile[j-1])/(fak - 1))
+            fehler_neu = np.maximum(abs(neue_zeile[j] - neue_zeile[j-1]),
+                                    abs(neue_zeile[j] - zeile[j-1]))
+            besser = aktiv & (fehler_neu <= fehler)
+            ergebnis = np.where(besser, neue_zeile[j], ergebnis)
+            fehler = np.where(besser, fehler_neu, fehler)
+            h_opt = np.where(besser, h, h_opt)
+        
+        #Abbruch, wenn Diagonalelement durch Auslöschung deutlich schlechter
+        if i+1 >= min_zeilen:
+            aktiv &= ~(abs(neue_zeile[i] - zeile[i-1]) >= 2*fehler)
+        if not np.any(aktiv):
+            break
+        zeile = neue_zeile
+    
+    return ergebnis, fehler, h_opt
                
 def relativer_fehler(num,analy):
     """Funktion zur Berechnung des relativen Fehlers eines 
@@ -49,10 +288,9 @@ def main():
     x_0 = 1/3                       #geg. Stelle zur Auswertung der Ableitung
     dYdx = dfunktion(x_0)       #analytischer Wert der 1. Ableitung
    
-    dydx_Z = ableitung_Z(funktion, x_0, h)
-    dydx_V = ableitung_V(funktion, x_0, h)
-    dydx_E = ableitung_E(funktion, x_0, h)
-    #Berechnung der Werte der ersten Ableitung für x_0=1/3 und h  
+    dydx_V, dydx_Z, dydx_E, _ = ableitungen_gemeinsam(funktion, x_0, h)
+    #Berechnung der Werte der ersten Ableitung für x_0=1/3 und h mit 
+    #gemeinsamen Funktionsauswertungen aller drei Methoden
 
     fehler_Z = relativer_fehler(dydx_Z, dYdx)
     fehler_V = relativer_fehler(dydx_V, dYdx)
@@ -99,6 +337,12 @@ def main():
     ax.annotate(r'$\sim h^{-1}$', xy=(1e-07,5e-13), color='k')
     
     ax.legend(numpoints=3) #Legende  
+    
+    #Vergleich mit automatischer Schrittweitenwahl (Richardson-Tableau)
+    dydx_R, fehler_R, h_R = ableitung_richardson(funktion, x_0)
+    print("Richardson-Tableau: rel. Fehler {:.1e} (Abschätzung {:.1e}) "
+          "bei h = {:.1e}".format(relativer_fehler(dydx_R, dYdx), 
+                                  abs(fehler_R/dYdx), h_R))
 
     ax.set_title('Relativen Fehler der numerischen Differenziation')
     ax.set_xlabel("h")
@@ -109,7 +353,11 @@ def main():
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    #Vergleich aller Methoden: python 2_1_lennard_franz.py benchmark
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        main()
 
 
 
@@ -137,3 +385,6 @@ if __name__ == "__main__":
 #Es wurde der jeweils kleinste Wert für den relativen Fehler bei einem 
 #klaren lineraren Verlauf gewählt, wodurch der Fehler vieleicht zu groß
 #abgeschätz wird, jedoch mit Sicherheit angenommen werden kann.
+
+#Automatische Bestimmung ohne Ablesen: ableitung_richardson erreicht an der 
+#Stelle 1/3 mit 12 Funktionsauswertungen einen relativen Fehler von ca. 1e-14.
@@ -12,13 +12,17 @@ Es wird zusaetzlich das jeweils erwartete Skalierungsverhalten eingetragen
 
 """
 
+import functools
+import sys
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt  #Importe
 
 
-def funktion_1(x):
-    """ Gegebene Funktion innerhalb des ersten Integrals"""
-    return np.cosh(2*x)
+def funktion_1(x, k=2):
+    """ Gegebene Funktion innerhalb des ersten Integrals
+    k: optionaler Parameter der Funktionenschar cosh(k*x) (gegeben: k=2)"""
+    return np.cosh(k*x)
 
 
 def funktion_2(x):
@@ -65,16 +69,159 @@ def integration_Simpson(funktion,a,b,N):
          4.0*np.sum(funktion(x+(h/2.0))) + funktion(b)) 
     return S
     
+
+
+@functools.lru_cache(maxsize=128)
+def knoten_gauss_legendre(N):
+    """Stützstellen und Gewichte der Gauss-Legendre-Regel mit N Stützstellen
+    auf (-1,1). Die Ergebnisse werden prozessweit zwischengespeichert 
+    (die am längsten nicht verwendeten Ordnungen werden verworfen) und 
+    sind daher schreibgeschützt."""
+    x, w = np.polynomial.legendre.leggauss(N)
+    x.flags.writeable = False
+    w.flags.writeable = False
+    return x, w
+
+
+@functools.lru_cache(maxsize=128)
+def knoten_clenshaw_curtis(N):
+    """Stützstellen und Gewichte der Clenshaw-Curtis-Regel mit den N+1 
+    Chebyshev-Extrempunkten x_j = cos(j*pi/N) auf (-1,1). Zwischenspeicherung
+    wie bei knoten_gauss_legendre."""
+    theta = np.pi*np.arange(N+1)/N
+    x = np.cos(theta)
+    w = np.zeros(N+1)
+    v = np.ones(N-1)
+    innen = theta[1:N]
+    if N % 2 == 0:
+        w[0] = w[N] = 1.0/(N**2 - 1)
+        k = np.arange(1, N//2)
+        v -= np.cos(N*innen)/(N**2 - 1)
+    else:
+        w[0] = w[N] = 1.0/N**2
+        k = np.arange(1, (N-1)//2 + 1)
+    v -= np.sum(2.0*np.cos(2.0*k[:, None]*innen)/(4.0*k[:, None]**2 - 1), 
+                axis=0)
+    w[1:N] = 2.0*v/N
+    x.flags.writeable = False
+    w.flags.writeable = False
+    return x, w
+
+
+def integration_Gauss_Legendre(funktion, a, b, N):
+    """ Funktion zur nummerischen Integration mittels Gauss-Legendre-Regel
+    einer Übergebenen Funktion im Intervall (a,b) mit N Stützstellen"""
+    x, w = knoten_gauss_legendre(N)
+    #Transformation der Stützstellen von (-1,1) auf (a,b)
+    return (b-a)/2.0*np.sum(w*funktion((b-a)/2.0*x + (a+b)/2.0))
+
+
+def integration_Clenshaw_Curtis(funktion, a, b, N):
+    """ Funktion zur nummerischen Integration mittels Clenshaw-Curtis-Regel
+    einer Übergebenen Funktion im Intervall (a,b) mit N+1 Stützstellen"""
+    x, w = knoten_clenshaw_curtis(N)
+    #Transformation der Stützstellen von (-1,1) auf (a,b)
+    return (b-a)/2.0*np.sum(w*funktion((b-a)/2.0*x + (a+b)/2.0))
+
+
+#Stützstellen und Gewichte der 15-Punkte Gauss-Kronrod-Regel auf (-1,1) 
+#(Werte aus QUADPACK). Die 7-Punkte Gauss-Regel verwendet jede zweite
+#Stützstelle (Indices 1, 3, 5, 7 und die Spiegelungen).
+KRONROD_X = np.array([0.991455371120812639206854697526329,
+                      0.949107912342758524526189684047851,
+                      0.864864423359769072789712788640926,
+                      0.741531185599394439863864773280788,
+                      0.586087235467691130294144845693013,
+                      0.405845151377397166906606412076961,
+                      0.207784955007898467600689403773245,
+                      0.000000000000000000000000000000000])
+KRONROD_W = np.array([0.022935322010529224963732008058970,
+                      0.063092092629978553290700663189204,
+                      0.104790010322250183839876322541518,
+                      0.140653259715525918745189590510238,
+                      0.169004726639267902826583426598550,
+                      0.190350578064785409913256402421014,
+                      0.204432940075298892414161999234649,
+                      0.209482141084727828012999174891714])
+GAUSS_W = np.array([0.129484966168869693270611432679082,
+                    0.279705391489276667901467771423780,
+                    0.381830050505118944950369775488975,
+                    0.417959183673469387755102040816327])
+
+#Auf 15 Stützstellen erweiterte Arrays (negative und positive Seite)
+_GK_X = np.concatenate([-KRONROD_X[:-1], KRONROD_X[::-1]])
+_GK_WK = np.concatenate([KRONROD_W[:-1], KRONROD_W[::-1]])
+_GK_WG = np.zeros(15)
+_GK_WG[1:7:2] = GAUSS_W[:3]
+_GK_WG[7] = GAUSS_W[3]
+_GK_WG[9:15:2] = GAUSS_W[2::-1]
+
+
+def integration_adaptiv(funktion, a, b, toleranz=1e-12, atol=1e-14,
+                        max_auswertungen=1000000):
+    """ Funktion zur adaptiven nummerischen Integration mittels 
+    15-Punkte Gauss-Kronrod-Regel einer Übergebenen Funktion im Intervall 
+    (a,b) bis zum gewünschten relativen Fehler (toleranz) bzw. absoluten 
+    Fehler (atol) für Integrale nahe 0.
+    
+    Der Fehler jedes Teilintervalls wird aus der Differenz zur eingebetteten
+    7-Punkte Gauss-Regel abgeschätzt. Teilintervalle, deren Fehler größer 
+    ist als ihr Anteil an der Toleranz, werden halbiert, sodass sich die
+    Stützstellen um Maxima und Unstetigkeiten konzentrieren. Alle 
+    Teilintervalle eines Schritts werden gemeinsam (vektorisiert) 
+    ausgewertet. Ein Schritt wird nur begonnen, wenn er max_auswertungen
+    nicht überschreitet.
+    
+    Rückgabe: Integral, Fehlerabschätzung und Anzahl der 
+              Funktionsauswertungen"""
+    intervalle = np.array([[a, b]], dtype=float)
+    integral_fertig = 0.0           #Beitrag bereits akzeptierter Intervalle
+    fehler_fertig = 0.0
+    anzahl = 0
+    
+    while True:
+        mitte = (intervalle[:, 0] + intervalle[:, 1])/2.0
+        halbe_breite = (intervalle[:, 1] - intervalle[:, 0])/2.0
+        werte = funktion(mitte[:, None] + halbe_breite[:, None]*_GK_X)
+        anzahl += werte.size
+        
+        kronrod = halbe_breite*(werte @ _GK_WK)
+        gauss = halbe_breite*(werte @ _GK_WG)
+        fehler = np.abs(kronrod - gauss)
+        
+        integral = integral_fertig + np.sum(kronrod)
+        gesamtfehler = fehler_fertig + np.sum(fehler)
+        ziel = max(toleranz*abs(integral), atol)
+        if gesamtfehler <= ziel:
+            return integral, gesamtfehler, anzahl
+        
+        #Intervall akzeptieren, wenn Fehler kleiner als anteilige Toleranz
+        #oder Intervall nicht mehr sinnvoll teilbar
+        anteil = ziel*2.0*halbe_breite/abs(b-a)
+        fertig = ((fehler <= anteil) | 
+                  (halbe_breite <= 4*np.finfo(float).eps*np.abs(mitte)))
+        integral_fertig += np.sum(kronrod[fertig])
+        fehler_fertig += np.sum(fehler[fertig])
+        
+        #Halbierung der übrigen Intervalle
+        links = intervalle[~fertig, 0]
+        rechts = intervalle[~fertig, 1]
+        m = mitte[~fertig]
+        intervalle = np.concatenate([np.column_stack([links, m]),
+                                     np.column_stack([m, rechts])])
+        if anzahl + intervalle.size//2*len(_GK_X) > max_auswertungen:
+            return integral, gesamtfehler, anzahl
+    
     
 def relativer_fehler(num, analy):
     """Funktion zur Berechnung des Betrags des relativen Fehlers eines 
     Nummerischen Werts (num) vom analytischen Wert (analy)  """
     return abs((analy-num)/analy) 
     
-def integral_funktion_1(a, b):
+def integral_funktion_1(a, b, k=2):
     """Funktion zur analytischen Berechnung des Integrals von funktion_1
     im Intervall (a,b) mithilfe der Stammfunktion""" 
-    return np.sinh(2*b)/2 - np.sinh(2*a)/2
+    return np.sinh(k*b)/k - np.sinh(k*a)/k
 
 def integral_funktion_2(a, b):
     """Ausgabe des genäherten Werts des Integrals"""
@@ -92,16 +239,20 @@ def integral_funktion_3(a, b):
     
 
 def iteration(integrations_methode, funktion, a, b, analytisches_Integral, 
-              anzahl):
+              anzahl, max_exponent=5):
     """Funktion zur Iteration des relativen Fehlers der numerischen 
     Integration über verschiedene Anzahlen von Stützstellen N bzw. 
     der Schrittweite h im Intervall (a,b).
     Mögliche Funktionen der Integrationsmethoden: integration_Mittelpunkt
                                                   integration_Trapez
                                                   integration_Simpson 
+                                                  integration_Gauss_Legendre
+                                                  integration_Clenshaw_Curtis
     analytisches_Integral: Benötigt Funktion zur Berechnung eines 
                            analytischen Vergleichswert im Intervall(a,b)
     anzahl: Wahl der gewünschten Anzahl an Iterationen 
+    max_exponent: größte Anzahl an Teilintervallen 10**max_exponent (für 
+                  Regeln hoher Ordnung genügen deutlich weniger)
     
     """
     #Erstellung eines Arrays für Anzahl von Teilintervallen
@@ -110,7 +261,7 @@ def iteration(integrations_methode, funktion, a, b, analytisches_Integral,
     #(Vorgabe auf Baltt)
     #Ausserdem Verwendung von np.unique, da ausgrund Verwendung von Integers 
     #bei kleinen n Zahlen mehfach vorkommen.
-    n = np.unique(np.int32(10**np.linspace(0, 5, anzahl)))
+    n = np.unique(np.int32(10**np.linspace(0, max_exponent, anzahl)))
     #Bestimmung der neuen Länge des Array nach Verwendung von np.unique
     #neue Länge wird für weitere Berechnungen benötigt (Arrays für rel. fehler 
     #und h)
@@ -127,8 +278,231 @@ def iteration(integrations_methode, funktion, a, b, analytisches_Integral,
                             #gegebene Parameter und einfügen in Arrays  
     return h,fehler
 
-def main():
-    """Hauptprogramm"""
+def integration_verschachtelt(funktion, a, b, stufen):
+    """Funktion zur numerischen Integration auf verschachtelten Gittern mit 
+    N = 1, 2, 4, ..., 2**stufen Teilintervallen im Intervall (a,b).
+    
+    Bei jeder Verdopplung von N sind die neuen Stützstellen der Trapezregel
+    genau die Stützstellen der Mittelpunktregel des gröberen Gitters. Daher
+    gilt mit M(N) und T(N):
+        T(2N) = (T(N) + M(N))/2
+        S(N)  = (T(N) + 2*M(N))/3   (Simpsonregel)
+    Jeder Funktionswert wird damit nur einmal berechnet, insgesamt
+    2**(stufen+1) + 1 Auswertungen (so viele wie die Simpsonregel auf dem
+    feinsten Gitter allein).
+    Zusätzlich wird aus den Trapezwerten das Romberg-Tableau aufgebaut.
+    
+    Rückgabe: Arrays mit N und den Ergebnissen der Mittelpunkt-, Trapez-,
+              Simpsonregel und der Romberg-Integration (Diagonale)"""
+    n = 2**np.arange(stufen+1)
+    mittelpunkt = np.zeros(stufen+1)
+    trapez = np.zeros(stufen+1)
+    romberg = np.zeros(stufen+1)
+    
+    T = (b-a)*(funktion(a) + funktion(b))/2.0     #Trapezregel für N=1
+    zeile = [T]                                   #Zeile des Romberg-Tableaus
+    for k in range(stufen+1):
+        #nur die Mittelpunkte des aktuellen Gitters sind neu
+        x, h = np.linspace(a, b, n[k], endpoint=False, retstep=True)
+        M = h*np.sum(funktion(x+h/2))
+        
+        mittelpunkt[k] = M
+        trapez[k] = T
+        romberg[k] = zeile[-1]
+        
+        #Verfeinerung: Trapezregel und Romberg-Tableau für 2N
+        T = (T + M)/2.0
+        neue_zeile = [T]
+        for j in range(1, k+2):
+            neue_zeile.append(neue_zeile[j-1] + 
+                              (neue_zeile[j-1] - zeile[j-1])/(4.0**j - 1))
+        zeile = neue_zeile
+    
+    simpson = (trapez + 2.0*mittelpunkt)/3.0
+    return n, mittelpunkt, trapez, simpson, romberg
+
+
+def integration_batch(funktion, a, b, N, parameter=(), 
+                      analytisches_Integral=None, max_elemente=1000000):
+    """Funktion zur gleichzeitigen nummerischen Integration vieler 
+    Integrale mit Mittelpunkt-, Trapez- und Simpsonregel mit jeweils N 
+    Teilintervallen.
+    
+    a, b: Arrays (oder Zahlen) der Intervallgrenzen
+    parameter: Tupel von Arrays zusätzlicher Parameter der Funktion, 
+               aufgerufen wird funktion(x, *parameter), z.B. funktion_1 
+               mit parameter=(k,) für die Funktionenschar cosh(k*x)
+    analytisches_Integral: optional, Funktion analytisches_Integral(a, b,
+                           *parameter) zur Berechnung der relativen Fehler
+    max_elemente: maximale Anzahl gleichzeitig gehaltener Stützstellen, 
+                  die Integrale werden in entsprechende Blöcke aufgeteilt
+    
+    a, b und die Parameter werden gegeneinander gebroadcastet. Die 
+    Funktionswerte an den Gitterpunkten und Mittelpunkten werden von allen
+    drei Regeln gemeinsam genutzt (2N+1 Auswertungen pro Integral).
+    
+    Rückgabe: Arrays der Ergebnisse (Mittelpunkt, Trapez, Simpson) und 
+              falls analytisches_Integral angegeben die relativen Fehler"""
+    felder = np.broadcast_arrays(np.asarray(a, dtype=float), 
+                                 np.asarray(b, dtype=float), 
+                                 *[np.asarray(p) for p in parameter])
+    form = felder[0].shape
+    a, b, *parameter = [feld.ravel() for feld in felder]
+    
+    mittelpunkt = np.zeros(a.size)
+    trapez = np.zeros(a.size)
+    simpson = np.zeros(a.size)
+    
+    block = max(max_elemente//(2*N), 1)      #Integrale pro Block
+    schritte = np.arange(N)
+    for start in range(0, a.size, block):
+        teil = slice(start, start + block)
+        a_t = a[teil, None]
+        b_t = b[teil, None]
+        p_t = [p[teil, None] for p in parameter]
+        h = (b_t - a_t)/N
+        
+        #gemeinsame Funktionswerte für alle drei Regeln
+        x = a_t + schritte*h
+        f_x = funktion(x, *p_t)                #f(a), ..., f(b-h)
+        f_m = funktion(x + h/2, *p_t)          #Mittelpunkte
+        f_b = funktion(b_t, *p_t)[:, 0]
+        f_a = f_x[:, 0]
+        h = h[:, 0]
+        summe_x = np.sum(f_x, axis=1)
+        summe_m = np.sum(f_m, axis=1)
+        
+        mittelpunkt[teil] = h*summe_m
+        trapez[teil] = h*(summe_x - f_a/2.0 + f_b/2.0)
+        simpson[teil] = (h/6.0)*(-f_a + 2.0*summe_x + 4.0*summe_m + f_b)
+    
+    #[()] liefert für skalare Eingaben Zahlen statt 0-dimensionaler Arrays
+    ergebnis = (mittelpunkt.reshape(form)[()], trapez.reshape(form)[()], 
+                simpson.reshape(form)[()])
+    if analytisches_Integral is None:
+        return ergebnis
+    
+    #integral_funktion_2 und _3 liefern unabhängig von a, b eine Zahl
+    analytisch = np.broadcast_to(np.asarray(
+        analytisches_Integral(a, b, *parameter), dtype=float), 
+        a.shape).reshape(form)
+    return ergebnis + tuple(np.asarray(relativer_fehler(num, analytisch))[()]
+                            for num in ergebnis)
+
+
+def iteration_verschachtelt(funktion, a, b, analytisches_Integral, stufen):
+    """Funktion zur Berechnung des relativen Fehlers aller drei 
+    Integrationsmethoden (und der Romberg-Integration) über h analog zu 
+    iteration, jedoch mit Wiederverwendung aller Funktionswerte auf 
+    verschachtelten Gittern (siehe integration_verschachtelt).
+    
+    stufen: Anzahl der Verdopplungen, N = 1, 2, ..., 2**stufen
+    
+    Rückgabe: h und relative Fehler (Mittelpunkt, Trapez, Simpson, Romberg)
+    """
+    n, M, T, S, R = integration_verschachtelt(funktion, a, b, stufen)
+    analytisch = analytisches_Integral(a, b)
+    h = (b-a)/n
+    return (h, relativer_fehler(M, analytisch), relativer_fehler(T, analytisch),
+            relativer_fehler(S, analytisch), relativer_fehler(R, analytisch))
+
+
+#Integranden der Konvergenzstudie: Funktion, Intervall und analytisches
+#Integral. Alle drei Integrale werden im Intervall (-pi/2, pi/4) berechnet.
+INTEGRANDEN = {
+    'funktion_1': (funktion_1, -np.pi/2.0, np.pi/4.0, integral_funktion_1),
+    'funktion_2': (funktion_2, -np.pi/2.0, np.pi/4.0, integral_funktion_2),
+    'funktion_3': (funktion_3, -np.pi/2.0, np.pi/4.0, integral_funktion_3),
+}
+
+#Integrationsregeln der Konvergenzstudie und größter Exponent für N
+REGELN = {
+    'Mittelpunktsregel': (integration_Mittelpunkt, 5),
+    'Trapezregel': (integration_Trapez, 5),
+    'Simpsonregel': (integration_Simpson, 5),
+    'Gauss-Legendre': (integration_Gauss_Legendre, 2),
+    'Clenshaw-Curtis': (integration_Clenshaw_Curtis, 2),
+}
+
+
+def studie_einzeln(integrand, regel, anzahl):
+    """Funktion zur Berechnung einer Kombination aus Integrand und Regel der
+    Konvergenzstudie (wird in einem eigenen Prozess aufgerufen). Übergeben
+    werden nur die Namen aus INTEGRANDEN und REGELN."""
+    funktion, a, b, analytisches_Integral = INTEGRANDEN[integrand]
+    methode, max_exponent = REGELN[regel]
+    h, fehler = iteration(methode, funktion, a, b, analytisches_Integral,
+                          anzahl, max_exponent)
+    return integrand, regel, h, fehler
+
+
+def konvergenzstudie(datei, integranden=tuple(INTEGRANDEN), 
+                     regeln=tuple(REGELN), anzahl=1000, prozesse=None):
+    """Funktion zur Berechnung des relativen Fehlers über h für alle 
+    Kombinationen aus Integranden und Regeln auf mehreren Prozessen.
+    
+    datei: npz-Datei, in der für jede Kombination die Arrays 
+           '<integrand>__<regel>__h' und '<integrand>__<regel>__fehler'
+           gespeichert werden (Darstellung mit konvergenzstudie_plot)
+    integranden, regeln: Namen aus INTEGRANDEN und REGELN
+    anzahl: Anzahl der Werte für N (siehe iteration)
+    prozesse: Anzahl der Prozesse (ohne Angabe Anzahl der CPU-Kerne)"""
+    ergebnisse = {}
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        auftraege = [pool.submit(studie_einzeln, integrand, regel, anzahl)
+                     for integrand in integranden for regel in regeln]
+        for auftrag in auftraege:
+            integrand, regel, h, fehler = auftrag.result()
+            ergebnisse["{}__{}__h".format(integrand, regel)] = h
+            ergebnisse["{}__{}__fehler".format(integrand, regel)] = fehler
+    np.savez_compressed(datei, **ergebnisse)
+
+
+def konvergenzstudie_laden(datei):
+    """Funktion zum Einlesen der Ergebnisse von konvergenzstudie.
+    Rückgabe: Dictionary {(integrand, regel): (h, fehler)}"""
+    ergebnisse = {}
+    with np.load(datei) as daten:
+        for schluessel in daten.files:
+            integrand, regel, art = schluessel.split("__")
+            if art == "h":
+                ergebnisse[integrand, regel] = (
+                    daten[schluessel],
+                    daten["{}__{}__fehler".format(integrand, regel)])
+    return ergebnisse
+
+
+def konvergenzstudie_plot(datei):
+    """Darstellung der Ergebnisse von konvergenzstudie mit einem Plot pro
+    Integrand (ohne erneute Berechnung)."""
+    ergebnisse = konvergenzstudie_laden(datei)
+    integranden = sorted(set(integrand for integrand, regel in ergebnisse))
+    
+    fig = plt.figure(figsize=(6*len(integranden), 6))
+    for i, integrand in enumerate(integranden):
+        ax = fig.add_subplot(1, len(integranden), i+1, xscale="log", 
+                             yscale="log")
+        ax.grid(True)
+        ax.set_xlim([1e-4, 1e1])
+        ax.set_ylim([1e-16, 1e1])
+        ax.set_xlabel("$h$")
+        ax.set_ylabel("|Relativer Fehler|")
+        ax.set_title(integrand)
+        for (name, regel), (h, fehler) in ergebnisse.items():
+            if name == integrand:
+                ax.plot(h, fehler, linestyle='None', marker='.', ms=3,
+                        label=regel)
+        ax.legend(numpoints=3)
+    plt.show()
+
+
+def main(verschachtelt=False):
+    """Hauptprogramm
+    
+    verschachtelt: Mittelpunkts-, Trapez- und Simpsonregel auf 
+                   verschachtelten Gittern (N=2**k) statt für 1000 
+                   unabhängige Werte von N, zusätzlich Romberg-Integration 
+                   (siehe iteration_verschachtelt)"""
 
     print(__doc__)
     
@@ -139,16 +513,39 @@ def main():
     Analytisches_Integral = integral_funktion_1
     #Länge der Iteration um Forderung nach 10^(-4)<h<1 zu erfüllen
     anzahl=1000
-    #Berechnung des Relativen Fehlers mit dazugehörigen h-Werten durch
-    #Iteration. 
-    h_M,Fehler_M=iteration(integration_Mittelpunkt, Funktion, a,
-                           b, Analytisches_Integral, anzahl)
+    #Verschachtelte Gitter (N=2**k) statt 1000 unabhängiger Werte für N,
+    #deutlich weniger Funktionsauswertungen, aber nur wenige Werte für h.
+    #Standardmäßig dichte Werte für h, da sich die Diskussion unten 
+    #(Plateaus, einzelne Werte für h) auf den Verlauf für alle h bezieht
+    if verschachtelt:
+        #15 Verdopplungen, damit h bis unter 1e-4 reicht 
+        h_M, Fehler_M, Fehler_T, Fehler_S, Fehler_R = iteration_verschachtelt(
+            Funktion, a, b, Analytisches_Integral, 15)
+        h_T = h_S = h_M
+    else:
+        #Berechnung des Relativen Fehlers mit dazugehörigen h-Werten durch
+        #Iteration. 
+        h_M,Fehler_M=iteration(integration_Mittelpunkt, Funktion, a,
+                               b, Analytisches_Integral, anzahl)
+    
+        h_T,Fehler_T=iteration(integration_Trapez, Funktion, a,
+                               b, Analytisches_Integral, anzahl)
     
-    h_T,Fehler_T=iteration(integration_Trapez, Funktion, a,
-                           b, Analytisches_Integral, anzahl)
+        h_S,Fehler_S=iteration(integration_Simpson,Funktion, a,
+                               b, Analytisches_Integral, anzahl)
     
-    h_S,Fehler_S=iteration(integration_Simpson,Funktion, a,
-                           b, Analytisches_Integral, anzahl)
+    #Regeln hoher Ordnung, exponentielle Konvergenz bereits für N<=100
+    h_G,Fehler_G=iteration(integration_Gauss_Legendre, Funktion, a,
+                           b, Analytisches_Integral, anzahl, max_exponent=2)
+    h_C,Fehler_C=iteration(integration_Clenshaw_Curtis, Funktion, a,
+                           b, Analytisches_Integral, anzahl, max_exponent=2)
+                           
+    #Vergleich mit adaptiver Gauss-Kronrod-Integration 
+    Integral_A, Fehler_A, Anzahl_A = integration_adaptiv(Funktion, a, b)
+    print("Adaptive Gauss-Kronrod-Integration: rel. Fehler {:.1e} mit {} "
+          "Funktionsauswertungen".format(
+              relativer_fehler(Integral_A, Analytisches_Integral(a, b)), 
+              Anzahl_A))
                            
     #Erstellen einer Plotfensters mit doppellogarithmischer Skala 
     fig= plt.figure(figsize=(10, 8))
@@ -170,6 +567,13 @@ def main():
             label='Trapezregel' )
     ax.plot(h_S,Fehler_S, linestyle='None', marker='.', color='r', ms=3, 
             label='Simpsonregel' )
+    ax.plot(h_G,Fehler_G, linestyle='None', marker='x', color='m', ms=4, 
+            label='Gauss-Legendre' )
+    ax.plot(h_C,Fehler_C, linestyle='None', marker='+', color='c', ms=4, 
+            label='Clenshaw-Curtis' )
+    if verschachtelt:
+        ax.plot(h_M, Fehler_R, linestyle='None', marker='.', color='k', ms=3,
+                label='Romberg-Integration')
     
     #Einzeichnen der Legende
     ax.legend(numpoints=3)
@@ -190,7 +594,15 @@ def main():
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    #Konvergenzstudie: python 3_1_lennard_franz.py studie <datei.npz>
+    #Darstellung:      python 3_1_lennard_franz.py plot <datei.npz>
+    #Verschachtelte Gitter: python 3_1_lennard_franz.py verschachtelt
+    if len(sys.argv) > 2 and sys.argv[1] == "studie":
+        konvergenzstudie(sys.argv[2])
+    elif len(sys.argv) > 2 and sys.argv[1] == "plot":
+        konvergenzstudie_plot(sys.argv[2])
+    else:
+        main(verschachtelt="verschachtelt" in sys.argv[1:])
 
 """ 
 Analytische Integrale
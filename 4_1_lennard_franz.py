@@ -16,8 +16,14 @@ Außerdem sind in beiden Darstellungen Konturlinen H für geeignet gewählte
 Energien geplottet.
 """
 import functools
+import hashlib
+import os
+import sys
+import time
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from contourpy import contour_generator
 from scipy.integrate import odeint          # Importe
 
 
@@ -34,12 +40,485 @@ def hamilton_fkt(x, p, A, B, omega, t):
     """Funktion zur Berechnung der gegebenen Hamiltonfunktion."""
     return (p**2.0)/2.0 + x**4.0 - x**2.0 + x*(A + B*np.sin(omega*t))
 
+def rk4_schritt(ableitung, y, t, dt, args):
+    """Funktion zur Berechnung eines Schritts des klassischen 
+    Runge-Kutta-Verfahrens 4. Ordnung mit fester Schrittweite dt.
+    y kann ein 2D-Array der Form (2, M) sein, dann werden M Anfangswerte
+    gleichzeitig integriert (ableitung ist bereits vektorisiert)."""
+    k1 = ableitung(y, t, *args)
+    k2 = ableitung(y + dt/2.0*k1, t + dt/2.0, *args)
+    k3 = ableitung(y + dt/2.0*k2, t + dt/2.0, *args)
+    k4 = ableitung(y + dt*k3, t + dt, *args)
+    return y + dt/6.0*(k1 + 2.0*k2 + 2.0*k3 + k4)
+
+
+def symplektische_koeffizienten(verfahren):
+    """Funktion zur Bestimmung der Koeffizienten (c, d) eines symplektischen
+    Splitting-Verfahrens für separable Hamiltonfunktionen H = p^2/2 + V(x,t).
+    Ein Schritt besteht aus abwechselnden Drift- (x und t um c_i*dt) und
+    Kick-Schritten (p um d_i*dt*Kraft).
+    
+    verfahren: 'leapfrog'    Störmer-Verlet, 2. Ordnung
+               'forest_ruth' Forest-Ruth / Yoshida, 4. Ordnung
+               'yoshida6'    Yoshida (Dreifachsprung), 6. Ordnung
+    
+    Die Verfahren höherer Ordnung entstehen durch Hintereinanderausführung
+    von Leapfrog-Schritten mit den Gewichten w (Dreifachsprung), wobei 
+    aufeinanderfolgende Drift-Schritte zusammengefasst werden."""
+    w = np.array([1.0])
+    for ordnung in {'leapfrog': [], 'forest_ruth': [2], 
+                    'yoshida6': [2, 4]}[verfahren]:
+        w1 = 1.0/(2.0 - 2.0**(1.0/(ordnung + 1)))
+        w0 = 1.0 - 2.0*w1
+        w = np.concatenate([w1*w, w0*w, w1*w])
+    c = np.concatenate([[w[0]/2.0], (w[:-1] + w[1:])/2.0, [w[-1]/2.0]])
+    d = np.concatenate([w, [0.0]])
+    return c, d
+
+
+#Symplektische Verfahren, welche von poincare_abbildung unterstützt werden
+SYMPLEKTISCH = ('leapfrog', 'forest_ruth', 'yoshida6')
+
+#Standardverfahren der stroboskopischen Abbildung (Ergebnis von benchmark:
+#bei 100 Schritten pro Periode Energiefehler ~1e-8 gegenüber ~1e-5 bei rk4,
+#welches über viele Perioden systematisch Energie verliert)
+VERFAHREN = 'yoshida6'
+
+
+def symplektischer_schritt(ableitung, y, t, dt, koeffizienten, args):
+    """Funktion zur Berechnung eines Schritts eines symplektischen 
+    Splitting-Verfahrens (Koeffizienten aus symplektische_koeffizienten).
+    Im erweiterten Phasenraum wird die Zeit zusammen mit x im Drift-Schritt
+    fortgeschrieben, die Kraft -dV/dx im Kick-Schritt wird mit ableitung 
+    berechnet."""
+    c, d = koeffizienten
+    x, p = y
+    for c_i, d_i in zip(c, d):
+        x = x + c_i*dt*p                        #Drift
+        t = t + c_i*dt
+        if d_i != 0.0:
+            p = p + d_i*dt*ableitung(np.array([x, p]), t, *args)[1]   #Kick
+    return np.array([x, p])
+
+
+def poincare_abbildung(y, A, B, omega, schritte_pro_periode=100,
+                       verfahren=VERFAHREN):
+    """Funktion zur Berechnung der stroboskopischen Abbildung (Poincaré-
+    Abbildung): Integration der Zustände y (Form (2,) oder (2, M)) über 
+    genau eine Periode T = 2pi/omega mit festen Schritten.
+    Da die Hamiltonfunktion T-periodisch ist, beginnt jede Periode bei t=0.
+    
+    verfahren: 'rk4' (Runge-Kutta) oder eines der SYMPLEKTISCH-Verfahren
+               (Standard: VERFAHREN)
+    """
+    T = 2*np.pi/omega
+    dt = T/schritte_pro_periode
+    if verfahren == 'rk4':
+        for j in range(schritte_pro_periode):
+            y = rk4_schritt(ableitung, y, j*dt, dt, (A, B, omega))
+    else:
+        koeffizienten = symplektische_koeffizienten(verfahren)
+        for j in range(schritte_pro_periode):
+            y = symplektischer_schritt(ableitung, y, j*dt, dt, koeffizienten,
+                                       (A, B, omega))
+    return y
+
+
+def poincare_schnitte(y_0, A, B, omega, anzahl_perioden, 
+                      schritte_pro_periode=100, blocklaenge=1000,
+                      verfahren=VERFAHREN):
+    """Generator der stroboskopischen Punkte (x, p) zu den Zeiten t = n*T 
+    für n = 0, ..., anzahl_perioden in Blöcken der Form 
+    (blocklaenge, 2, M) bzw. (blocklaenge, 2) (der letzte Block kann 
+    kürzer sein). Es wird nie die volle Trajektorie gespeichert, der 
+    Speicherbedarf ist unabhängig von anzahl_perioden."""
+    y = np.array(y_0, dtype=float)
+    n = 0                                   #Anzahl bereits erzeugter Punkte
+    while n < anzahl_perioden+1:
+        laenge = min(blocklaenge, anzahl_perioden+1-n)
+        block = np.zeros((laenge,) + y.shape)
+        for i in range(laenge):
+            if n+i > 0:                     #Anfangswert nicht iterieren
+                y = poincare_abbildung(y, A, B, omega, schritte_pro_periode,
+                                       verfahren)
+            block[i] = y
+        n += laenge
+        yield block
+
+
+def poincare_in_datei(datei, y_0, A, B, omega, anzahl_perioden, 
+                      schritte_pro_periode=100, blocklaenge=1000,
+                      verfahren=VERFAHREN):
+    """Funktion zur Berechnung der stroboskopischen Punkte wie 
+    poincare_schnitte, welche blockweise direkt in eine .npy-Datei 
+    (Form (anzahl_perioden+1, 2, ...)) geschrieben werden. Die Datei kann 
+    mit np.load(datei, mmap_mode='r') ohne vollständiges Einlesen 
+    verwendet werden."""
+    y_0 = np.asarray(y_0, dtype=float)
+    ausgabe = np.lib.format.open_memmap(datei, mode='w+', 
+                                        shape=(anzahl_perioden+1,)+y_0.shape)
+    n = 0
+    for block in poincare_schnitte(y_0, A, B, omega, anzahl_perioden,
+                                   schritte_pro_periode, blocklaenge,
+                                   verfahren):
+        ausgabe[n:n+len(block)] = block
+        n += len(block)
+    ausgabe.flush()
+    del ausgabe
+
+
+def stroboskop_batch(y_0, A, B, omega, anzahl_perioden, 
+                     schritte_pro_periode=100, verfahren=VERFAHREN):
+    """Funktion zur gleichzeitigen Integration vieler Anfangswerte mit 
+    festen Schritten und Rückgabe der stroboskopischen Punkte.
+    
+    y_0: Array der Form (2, M) mit Orten (y_0[0]) und Impulsen (y_0[1]) 
+    anzahl_perioden: Anzahl der Perioden T = 2pi/omega
+    schritte_pro_periode: Anzahl der Schritte pro Periode
+    verfahren: siehe poincare_abbildung
+    
+    Rückgabe: Array der Form (anzahl_perioden+1, 2, M) mit (x, p) zu den
+              Zeiten t = n*T"""
+    return np.concatenate(list(poincare_schnitte(
+        y_0, A, B, omega, anzahl_perioden, schritte_pro_periode,
+        verfahren=verfahren)))
+
+
+def benchmark(anzahl_perioden=200):
+    """Vergleich der Integrationsverfahren bezüglich Rechenzeit und 
+    Genauigkeit für einen Startwert (x, p) = (0.719, -0.032).
+    
+    Energiefehler: maximale relative Abweichung der Energie an den 
+    stroboskopischen Punkten für B=0 (Energie erhalten).
+    Stroboskopischer Fehler: maximale Abweichung der stroboskopischen 
+    Punkte von einer sehr genauen odeint-Lösung für B=0.1 über 10 Perioden
+    (danach verstärkt die chaotische Dynamik jede Abweichung)."""
+    A = 0.1
+    omega = 1.0
+    T = 2*np.pi/omega
+    y_0 = np.array([0.719, -0.032])
+    
+    def energiefehler(strobo):
+        E = hamilton_fkt(strobo[:, 0], strobo[:, 1], A, 0.0, omega, 0)
+        return np.max(np.abs((E - E[0])/E[0]))
+    
+    t_ref = np.linspace(0.0, 10*T, 10*1000 + 1)
+    referenz = odeint(ableitung, y_0, t_ref, args=(A, 0.1, omega), 
+                      rtol=1e-13, atol=1e-13)[::1000]
+    
+    print("{:<14}{:>10}{:>12}{:>14}{:>16}".format(
+        "Verfahren", "Schritte/T", "Zeit [s]", "Energiefehler", 
+        "strobo. Fehler"))
+    
+    #bisheriger Weg: odeint mit 1000 Zeitpunkten pro Periode
+    t = np.linspace(0.0, anzahl_perioden*T, anzahl_perioden*1000 + 1)
+    start = time.perf_counter()
+    strobo = odeint(ableitung, y_0, t, args=(A, 0.0, omega))[::1000]
+    zeit = time.perf_counter() - start
+    fehler = np.max(np.abs(odeint(ableitung, y_0, t_ref, 
+                                  args=(A, 0.1, omega))[::1000] - referenz))
+    print("{:<14}{:>10}{:>12.3f}{:>14.2e}{:>16.2e}".format(
+        "odeint", "-", zeit, energiefehler(strobo), fehler))
+    
+    for verfahren in ('rk4',) + SYMPLEKTISCH:
+        for schritte in (50, 100, 200):
+            start = time.perf_counter()
+            strobo = stroboskop_batch(y_0, A, 0.0, omega, anzahl_perioden,
+                                      schritte, verfahren)
+            zeit = time.perf_counter() - start
+            fehler = np.max(np.abs(stroboskop_batch(
+                y_0, A, 0.1, omega, 10, schritte, verfahren) - referenz))
+            print("{:<14}{:>10}{:>12.3f}{:>14.2e}{:>16.2e}".format(
+                verfahren, schritte, zeit, energiefehler(strobo), fehler))
+
+
+def ableitung_variation(z, t, A, B, omega):
+    """Funktion zur Berechnung der zeitlichen Ableitungen der kanonischen 
+    Gleichungen zusammen mit den Variationsgleichungen.
+    z[0:2]: Ort und Impuls (wie in ableitung)
+    z[2:6]: Einträge der Jacobimatrix M (spaltenweise: M11, M21, M12, M22)
+            mit dM/dt = J(x) M und J = [[0, 1], [-12x^2+2, 0]]
+    z kann wie in ableitung die Form (6, M) haben."""
+    x = z[0]
+    d2V = -12.0*x**2 + 2.0                  #Ableitung der Kraft nach x
+    return np.array([z[1], -4.0*x**3.0 + 2.0*x - A - B*np.sin(omega*t),
+                     z[3], d2V*z[2], z[5], d2V*z[4]])
+
+
+def fluss_jacobi(y, versatz, schritte, dt, A, B, omega):
+    """Funktion zur Integration von schritte Runge-Kutta-Schritten der 
+    Variationsgleichungen ab der Zeit versatz*dt.
+    
+    y: Array der Form (2, M) der Startwerte
+    versatz: Zahl oder Array der Länge M (Startschritt innerhalb der 
+             Periode, für jeden Startwert eigene Startzeit)
+    
+    Rückgabe: Endwerte der Form (2, M) und Jacobimatrizen der Form (M, 2, 2)
+    """
+    eins = np.ones(y.shape[1])
+    null = np.zeros(y.shape[1])
+    z = np.array([y[0], y[1], eins, null, null, eins])
+    for j in range(schritte):
+        z = rk4_schritt(ableitung_variation, z, (versatz + j)*dt, dt, 
+                        (A, B, omega))
+    jacobi = np.stack([np.stack([z[2], z[4]], axis=-1), 
+                       np.stack([z[3], z[5]], axis=-1)], axis=1)
+    return z[:2], jacobi
+
+
+def poincare_jacobi(y, A, B, omega, n, schritte_pro_periode=100):
+    """Funktion zur Berechnung der n-fach angewendeten stroboskopischen 
+    Abbildung P^n und ihrer Jacobimatrix durch Integration der 
+    Variationsgleichungen (Runge-Kutta, feste Schritte).
+    
+    y: Array der Form (2, M) der Startwerte
+    
+    Rückgabe: P^n(y) der Form (2, M) und Jacobimatrizen der Form (M, 2, 2)
+    """
+    T = 2*np.pi/omega
+    dt = T/schritte_pro_periode
+    jacobi = np.broadcast_to(np.eye(2), (y.shape[1], 2, 2))
+    for k in range(n):
+        y, jacobi_k = fluss_jacobi(y, 0, schritte_pro_periode, dt, A, B, 
+                                   omega)
+        jacobi = jacobi_k @ jacobi
+    return y, jacobi
+
+
+def schiess_residuum(Y, A, B, omega, schritte_pro_periode, unterteilung):
+    """Funktion zur Berechnung der Residuen und der Jacobimatrix des 
+    Mehrfachschießverfahrens für periodische Orbits.
+    
+    Y: Array der Form (Anzahl Kandidaten, M, 2) mit den Punkten zu Beginn 
+       der M Teilstücke (je 1/unterteilung Periode) eines Orbits
+    
+    Residuen r_j = Phi_j(Y_j) - Y_{j+1} (zyklisch, Form (Anzahl, 2M)) und 
+    Jacobimatrix der Form (Anzahl, 2M, 2M) mit den Blöcken Phi_j' auf der 
+    Diagonalen und -1 rechts daneben. Alle Teilstücke werden gleichzeitig 
+    integriert."""
+    anzahl, M = Y.shape[:2]
+    schritte = schritte_pro_periode//unterteilung
+    dt = 2*np.pi/omega/schritte_pro_periode
+    versatz = np.tile((np.arange(M) % unterteilung)*schritte, anzahl)
+    ende, phi = fluss_jacobi(Y.reshape(-1, 2).T, versatz, schritte, dt, 
+                             A, B, omega)
+    residuum = (ende.T.reshape(anzahl, M, 2) 
+                - np.roll(Y, -1, axis=1)).reshape(anzahl, 2*M)
+    jacobi = np.zeros((anzahl, 2*M, 2*M))
+    phi = phi.reshape(anzahl, M, 2, 2)
+    for j in range(M):
+        k = (j + 1) % M
+        jacobi[:, 2*j:2*j+2, 2*j:2*j+2] += phi[:, j]
+        jacobi[:, 2*j:2*j+2, 2*k:2*k+2] -= np.eye(2)
+    return residuum, jacobi
+
+
+def periodische_orbits(A, B, omega, perioden=range(1, 6), gitter=20, 
+                       x_limit=1.5, p_limit=1.5, schritte_pro_periode=400, 
+                       toleranz=1e-9, max_iterationen=50, startwerte=None,
+                       unterteilung=4):
+    """Funktion zur Suche periodischer Orbits der stroboskopischen 
+    Abbildung mit dem Mehrfachschießverfahren.
+    
+    Für jede Periode n werden Startwerte auf einem groben Gitter 
+    (gitter x gitter im Bereich |x|<x_limit, |p|<p_limit) gewählt. Der 
+    Orbit wird in n*unterteilung Teilstücke zerlegt (schiess_residuum), 
+    deren Anfangspunkte gemeinsam mit gedämpften Gauß-Newton-Schritten 
+    (Levenberg-Marquardt) angepasst werden. Jeder Startwert wird zweimal
+    verwendet: entlang seiner Trajektorie fortgesetzt und konstant für alle
+    Teilstücke (für stark instabile Orbits). Die Teilstücke halten die 
+    Abbildungen auch für stark instabile Orbits nahezu linear, die Dämpfung
+    verhindert das Umherirren bei Spur ~2 (P^n - 1 fast singulär).
+    Gefundene Punkte werden auf minimale Periode n geprüft und Punkte 
+    desselben Orbits zusammengefasst.
+    
+    startwerte: optional, Array der Form (2, M) mit eigenen Startwerten 
+                anstelle des Gitters
+    unterteilung: Teilstücke pro Periode (Teiler von schritte_pro_periode)
+    schritte_pro_periode: Runge-Kutta ist nicht flächentreu; bei zu wenigen
+                Schritten übersteigt die Abweichung die Breite schmaler 
+                Resonanzen (z.B. der 15er-Kette aus Aufgabe c), die dann 
+                keinen periodischen Orbit mehr besitzen
+    
+    Rückgabe: Dictionary {n: (punkte, spur)} mit den Punkten aller 
+              gefundenen Orbits der Periode n (Form (Anzahl, 2)) und der 
+              Spur der Jacobimatrix (|spur|<2: elliptisch, Zentrum einer 
+              Inselkette; |spur|>2: hyperbolisch)"""
+    if startwerte is None:
+        x_0, p_0 = np.meshgrid(np.linspace(-x_limit, x_limit, gitter),
+                               np.linspace(-p_limit, p_limit, gitter))
+        startwerte = np.array([x_0.ravel(), p_0.ravel()])
+    schritte = schritte_pro_periode//unterteilung
+    dt = 2*np.pi/omega/schritte_pro_periode
+    ergebnis = {}
+    
+    for n in perioden:
+        M = n*unterteilung
+        #Anfangspunkte der Teilstücke entlang der Trajektorie der Startwerte
+        Y = [np.array(startwerte, dtype=float)]
+        for j in range(M - 1):
+            Y.append(fluss_jacobi(Y[-1], (j % unterteilung)*schritte, 
+                                  schritte, dt, A, B, omega)[0])
+        #zusätzlich alle Anfangspunkte gleich dem Startwert: entlang der 
+        #Trajektorie entfernt sich der Startwert von stark instabilen 
+        #Orbits (z.B. dem Sattelpunkt bei B=0) exponentiell
+        Y = np.concatenate([np.array(Y), 
+                            np.repeat(Y[:1], M, axis=0)], axis=2)
+        Y = Y.transpose(2, 0, 1)
+        residuum, jacobi = schiess_residuum(Y, A, B, omega, 
+                                            schritte_pro_periode, 
+                                            unterteilung)
+        kosten = np.sum(residuum**2, axis=1)
+        daempfung = 1e-3*np.max(np.sum(jacobi**2, axis=1), axis=1)
+        aktiv = np.ones(len(Y), dtype=bool)
+        
+        for i in range(max_iterationen):
+            aktiv &= np.max(np.abs(residuum), axis=1) >= toleranz
+            if not np.any(aktiv):
+                break
+            #Levenberg-Marquardt-Schritt (J^T J + mu) delta = -J^T r für 
+            #alle noch nicht konvergierten Kandidaten
+            J_a, r_a = jacobi[aktiv], residuum[aktiv]
+            J_T = J_a.transpose(0, 2, 1)
+            matrix = J_T @ J_a + daempfung[aktiv, None, None]*np.eye(2*M)
+            delta = -np.linalg.solve(matrix, J_T @ r_a[:, :, None])
+            Y_neu = Y[aktiv] + delta.reshape(-1, M, 2)
+            residuum_neu, jacobi_neu = schiess_residuum(
+                Y_neu, A, B, omega, schritte_pro_periode, unterteilung)
+            kosten_neu = np.sum(residuum_neu**2, axis=1)
+            #Schritt annehmen, falls die Residuen kleiner werden
+            besser = kosten_neu < kosten[aktiv]
+            index = np.flatnonzero(aktiv)[besser]
+            Y[index] = Y_neu[besser]
+            residuum[index] = residuum_neu[besser]
+            jacobi[index] = jacobi_neu[besser]
+            kosten[index] = kosten_neu[besser]
+            daempfung[aktiv] = np.where(besser, daempfung[aktiv]/3.0, 
+                                        daempfung[aktiv]*2.0)
+            #festgefahrene oder weit entfernte Kandidaten nicht fortsetzen
+            aktiv &= ((daempfung < 1e12) & 
+                      np.all(np.abs(Y[:, :, 0]) < 2*x_limit, axis=1) & 
+                      np.all(np.abs(Y[:, :, 1]) < 2*p_limit, axis=1))
+        
+        konvergiert = np.max(np.abs(residuum), axis=1) < toleranz
+        Y = Y[konvergiert]
+        #Punkte des Orbits zu Beginn jeder Periode: orbit[k] = P^k(y)
+        orbit = Y[:, ::unterteilung, :].transpose(1, 2, 0)
+        y = orbit[0]
+        spur = np.trace(poincare_jacobi(y, A, B, omega, n, 
+                                        schritte_pro_periode)[1], 
+                        axis1=1, axis2=2)
+        
+        #Punkte mit kleinerer Periode d (Teiler von n) verwerfen und alle 
+        #Punkte eines Orbits durch den Punkt mit kleinstem x darstellen
+        minimal = np.ones(y.shape[1], dtype=bool)
+        for d in range(1, n):
+            if n % d == 0:
+                minimal &= ~np.all(np.abs(orbit[d] - y) < 1e3*toleranz, 
+                                   axis=0)
+        orbit = orbit[:, :, minimal]
+        spur = spur[minimal]
+        index = np.argmin(orbit[:, 0], axis=0)
+        vertreter = orbit[index, :, np.arange(orbit.shape[2])]
+        _, eindeutig = np.unique(np.round(vertreter, 6), axis=0, 
+                                 return_index=True)
+        
+        punkte = orbit[:, :, eindeutig].transpose(2, 0, 1).reshape(-1, 2)
+        ergebnis[n] = (punkte, np.repeat(spur[eindeutig], n))
+    
+    return ergebnis
+
+
+#Verzeichnis für zwischengespeicherte Konturlinien
+KONTUR_VERZEICHNIS = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                  "kontur_cache")
+
+#Bereits geladene Konturlinien des laufenden Programms
+_kontur_speicher = {}
+
+
+def kontur_pfade(A, B, omega, x_limit, p_limit, aufloesung, energien, 
+                 verzeichnis=KONTUR_VERZEICHNIS):
+    """Funktion zur Berechnung der Konturlinien der Hamiltonfunktion (bei 
+    t=0) für die gegebenen Energien auf einem Gitter der Größe 
+    aufloesung x aufloesung.
+    
+    Die Linien werden anhand der Parameter (A, B, omega, Grenzen, 
+    Auflösung, Energien) im Speicher und als .npz-Datei im verzeichnis 
+    abgelegt, sodass sie für beide Plots und bei späteren Programmstarts
+    nicht erneut berechnet werden müssen (verzeichnis=None: nur Speicher).
+    
+    Rückgabe: Liste (pro Energie) von Listen der Linienstücke als Arrays 
+              der Form (Anzahl Punkte, 2)"""
+    schluessel = repr((float(A), float(B), float(omega), float(x_limit), 
+                       float(p_limit), int(aufloesung), 
+                       tuple(float(E) for E in energien)))
+    if schluessel in _kontur_speicher:
+        return _kontur_speicher[schluessel]
+    
+    datei = None
+    if verzeichnis is not None:
+        name = hashlib.sha1(schluessel.encode()).hexdigest()
+        datei = os.path.join(verzeichnis, "kontur_{}.npz".format(name))
+    
+    if datei is not None and os.path.exists(datei):
+        pfade = []
+        with np.load(datei) as daten:
+            for i in range(len(energien)):
+                #Linienstücke sind aneinandergehängt gespeichert
+                laengen = daten["laengen_{}".format(i)]
+                if len(laengen) == 0:
+                    #keine Konturlinie für diese Energie
+                    pfade.append([])
+                    continue
+                grenzen = np.cumsum(laengen)[:-1]
+                pfade.append(np.split(daten["punkte_{}".format(i)], grenzen))
+    else:
+        #Orts- und Impulsarray für Konturplot 
+        x_H = np.linspace(-x_limit, x_limit, aufloesung)
+        p_H = np.linspace(-p_limit, p_limit, aufloesung)
+        x_mesh, p_mesh = np.meshgrid(x_H, p_H)
+        H = hamilton_fkt(x_mesh, p_mesh, A, B, omega, 0)
+        
+        generator = contour_generator(x_mesh, p_mesh, H)
+        pfade = [generator.lines(E) for E in energien]
+        
+        if datei is not None:
+            daten = {}
+            for i, linien in enumerate(pfade):
+                daten["punkte_{}".format(i)] = (np.concatenate(linien) 
+                                                if linien else np.zeros((0, 2)))
+                daten["laengen_{}".format(i)] = np.array(
+                    [len(linie) for linie in linien], dtype=int)
+            os.makedirs(verzeichnis, exist_ok=True)
+            temp = datei + ".tmp.npz"
+            np.savez(temp, **daten)
+            os.replace(temp, datei)
+    
+    _kontur_speicher[schluessel] = pfade
+    return pfade
+
+
+def kontur_zeichnen(ax, pfade, farbe='k'):
+    """Funktion zum Zeichnen der Konturlinien aus kontur_pfade in ax."""
+    linien = [linie for linien_E in pfade for linie in linien_E]
+    ax.add_collection(LineCollection(linien, colors=farbe, linewidths=1.5),
+                      autolim=False)
+
+
 def wenn_maus_geklickt(event, A, B, omega, t, phasenplot, stroboplot, 
-                stepsize_strobo ):
+                stepsize_strobo, perioden_poincare=None, verfahren=VERFAHREN,
+                schritte_pro_periode=100):
     """Funktion zur Berechnung und Plotten der Trajektorien im Phasenraum und
     der stroboskopischen Darstellung. Dabei wird mit der linken Maustaste
     im Plotbereich der Startwert der zu berechnenden Trajektorien 
-    festgelegt."""
+    festgelegt.
+    
+    perioden_poincare: optional, bei Angabe wird nur die stroboskopische 
+    Darstellung für die gegebene Anzahl an Perioden mit poincare_schnitte 
+    berechnet und blockweise geplottet (keine Trajektorie im Phasenraum).
+    verfahren, schritte_pro_periode: Integrationsverfahren und Schrittzahl 
+    pro Periode der stroboskopischen Abbildung (siehe poincare_abbildung)."""
     # Test, ob Klick mit linker Maustaste und im Koordinatensystem
     # erfolgt sowie ob Zoomfunktion des Plotfensters deaktiviert ist:
     mode = event.canvas.toolbar.mode
@@ -47,6 +526,18 @@ def wenn_maus_geklickt(event, A, B, omega, t, phasenplot, stroboplot,
         #Festlegung Startwerte
         y_0 = np.array([event.xdata, event.ydata])
         
+        if perioden_poincare is not None:
+            farbe = None
+            for block in poincare_schnitte(y_0, A, B, omega, 
+                                           perioden_poincare,
+                                           schritte_pro_periode,
+                                           verfahren=verfahren):
+                linie, = stroboplot.plot(block[:, 0], block[:, 1], ls='None',
+                                         marker='.', ms=2, color=farbe)
+                farbe = linie.get_color()   #gleiche Farbe für alle Blöcke
+                event.canvas.draw()
+            return
+        
         #Lösung der bestimmten Differentialgleichung
         y = odeint(ableitung, y_0, t, args=(A, B, omega))
         #Aufspalten des 2D-Arrays in zwei 1D-Arrays
@@ -85,6 +576,17 @@ def main():
    
     anzahl_iterationen = 1000    
     
+    #Anzahl der Perioden für reine stroboskopische Darstellung ohne 
+    #Trajektorie (z.B. 100000), None: Trajektorie mit odeint. 
+    #Achtung: die Berechnung blockiert das Plotfenster, ein Klick mit 100000 
+    #Perioden dauert mehrere Minuten (ca. 0.25-1 s pro 200 Perioden)
+    perioden_poincare = None
+    #Verfahren und Schritte pro Periode der stroboskopischen Abbildung,
+    #symplektische Verfahren erhalten die Energie auch über viele Perioden 
+    #(rk4 driftet bei B=0 über 1e4 Perioden um ~50 %)
+    verfahren = VERFAHREN
+    schritte_pro_periode = 100
+    
     #Zeitberechnung 
     anzahl_perioden = 200
     T = 2*np.pi/omega
@@ -98,15 +600,10 @@ def main():
     #Energien für Konturlinien
     energien_contour = [-0.5, -0.2, -0.1, 0.0025, 0.2, 0.5, 1.0, 1.5] 
 
-    #Orts- und Impulsarray für Konturplot 
-    x_H= np.linspace(-x_limit, x_limit, anzahl_iterationen)
-    p_H= np.linspace(-p_limit, p_limit, anzahl_iterationen)
-
-    #Verwendung von Meshgrid zur Erzeugung 2D-Arrays für np.contour 
-    x_mesh, p_mesh = np.meshgrid(x_H, p_H)
-
-    #Berechnung der Energie mit Hamiltonfkt.
-    H = hamilton_fkt(x_mesh, p_mesh, A, B, omega, 0)
+    #Konturlinien der Hamiltonfkt., werden zwischengespeichert und nur 
+    #beim ersten Start berechnet
+    pfade = kontur_pfade(A, B, omega, x_limit, p_limit, anzahl_iterationen,
+                         energien_contour)
 
     #Erstellung Plottfenster 
     fig = plt.figure(figsize=(10, 6))
@@ -129,22 +626,42 @@ def main():
     stroboplot.set_ylim([-p_limit, p_limit])
     
     #Plotten der Contourplots
-    phasenplot.contour(x_mesh, p_mesh, H, energien_contour, colors='k')
-    stroboplot.contour(x_mesh, p_mesh, H, energien_contour, colors='k')
+    kontur_zeichnen(phasenplot, pfade)
+    kontur_zeichnen(stroboplot, pfade)
+    
+    #Optional: stroboskopische Darstellung für ein ganzes Gitter von 
+    #Anfangswerten, welche gleichzeitig integriert werden
+    ensemble = False
+    if ensemble:
+        x_0, p_0 = np.meshgrid(np.linspace(-1.5, 1.5, 30), 
+                               np.linspace(-1.5, 1.5, 30))
+        strobo = stroboskop_batch(np.array([x_0.ravel(), p_0.ravel()]), 
+                                  A, B, omega, anzahl_perioden,
+                                  schritte_pro_periode, verfahren)
+        stroboplot.plot(strobo[:, 0], strobo[:, 1], ls='None', marker='.', 
+                        ms=1)
     
     #Interaktion im Plot mithilfe der Funktion wenn_maus_geklickt
     click_function = functools.partial(wenn_maus_geklickt, omega=omega, A=A, 
                                        B=B, t=t,
                                        phasenplot=phasenplot,
                                        stroboplot=stroboplot,
-                                       stepsize_strobo=anzahl_iterationen)
+                                       stepsize_strobo=anzahl_iterationen,
+                                       perioden_poincare=perioden_poincare,
+                                       verfahren=verfahren,
+                                       schritte_pro_periode=
+                                       schritte_pro_periode)
     plt.connect('button_press_event', click_function)
     
     #Endlos-Schleife, die auf Ereignisse wartet:
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    #Vergleich der Integrationsverfahren: python 4_1_lennard_franz.py benchmark
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark()
+    else:
+        main()
 
 """
 
@@ -198,6 +715,11 @@ Anzahl Punkte: 15
 
 Periode: 94.248
 
+Kontrolle mit periodische_orbits(0.1, 0.1, 1.0, perioden=[15], 
+startwerte=np.array([[0.719], [-0.032]])): elliptischer Orbit der Periode 15 
+(Spur 1.9999999, sehr schmale Inselkette), nächster Punkt 
+x = 0.71890, p = -0.03180.
+
 """
 
 
@@ -18,26 +18,11 @@ der Reproduktionsrate wurde beta im bereich von 0.11 bis 0.5 variiert und gamma
 konstant gehalten. 
 """
 
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint  #Importe
-
-def beta_lockdown(t, beta, t_hammer, t_dance):
-    """ Funktion zur Umsetzung der Veränderung der 
-    Übertragungswahrscheinlichkeit während eines Lockdowns.
-    t: Zeitenarray
-    
-    beta: Basis Infektionswahrscheinlichkeit
-    
-    t_hammer und t_dance: Beginn und den Zeitpunkt der Lockerungen 
-    innerhalb des Lockdowns
-    """
-    if t < t_hammer:
-        return beta
-    elif t > t_hammer - 1 and t < t_dance:
-        return 0.3*beta
-    else:
-        return 0.5*beta
+from scipy.integrate import odeint
+import epidemie as ep               #Importe
 
 def diff_sys (f, t, beta, gamma):
     """Funktion zur Umsetzung des Differentialgleichungssystem des SIR-Modells. 
@@ -54,26 +39,12 @@ def diff_sys (f, t, beta, gamma):
     return dS, dI, dR
 
 
-def diff_sys_lockdown (f, t, beta, gamma, t_hammer, t_dance):
-    """Funktion zur Umsetzung des Differentialgleichungssystem des SIR-Modells.
-    Analog zur Funktion diff_sys, jedoch wird kein fest gewähltes beta verwendet
-    , sondern zur Simulation eines Lockdowns die bereits definierte Funktion 
-    beta_lockdown
-    f: Verktor mit Anfangswerten 
-    t: Zeitenarray
-    beta: Infektionswahrscheinlichkeit
-    gamma: Genesungswahrscheinlichkeit
-    t_hammer und t_dance: Beginn und den Zeitpunkt der Lockerungen 
-                          innerhalb des Lockdown
-    """
-    S, I, R = f
-    dS = -beta_lockdown(t, beta, t_hammer, t_dance) * S * I
-    dI = beta_lockdown(t, beta, t_hammer, t_dance) * S * I - gamma * I
-    dR = gamma*I
-    return dS, dI, dR
-
-def main():
-    """Hauptprogramm """
+def main(optimierung=False):
+    """Hauptprogramm 
+    
+    optimierung: zusätzlich Suche nach Lockdownplänen (Beginn, Dauer, Stärke)
+                 und Darstellung der Pareto-Front aus maximaler Last und
+                 Einschränkungstagen (siehe epidemie.lockdown_optimierung)"""
     print(__doc__)
     
     N = 80000000   #Gesamtpopulation
@@ -102,9 +73,9 @@ def main():
     S, I, R = F.T     #Verwendung von .T zur transponierung der Lösungsmatrix
     
     #analoges Lösen des gegebens DGL-Systems mit Berücksichtigung des Lockdowns
-    #zustätzlicher übergabe der Zeitüunkte des Lockdowns  
-    F_lock = odeint(diff_sys_lockdown, f_0, t, args=(beta, gamma, t_hammer, 
-                    t_dance))
+    #als Lockdownplan, odeint wird an den Umschaltzeiten neu gestartet
+    plan = ep.Lockdownplan([(t_hammer, 0.3), (t_dance, 0.5)])
+    F_lock = ep.loese_mit_plan(diff_sys, f_0, t, beta, plan, args=(gamma,))
     S_lock, I_lock, R_lock = F_lock.T #analog wie zuvor
     
     #Festlegung Iterationsparamter für Darstellung der maximal Infizierten in 
@@ -115,19 +86,20 @@ def main():
     #Erstellung angepasstest Zeiten-Array da für kleine beta die Betrachtung
     #von 150 Tagen nicht ausreichend ist.
     t_long = np.linspace(0,1000,1001) 
+    #Integrationsdauer der Kontrollrechnung in Tagen
+    t_kontrolle = 5000
     
-    #Erstellung leerer Arrays für Plot
-    Repro = np.zeros(iter_variaton)
-    I_max = np.zeros(iter_variaton)
-    #Schleife zur Berechnung der maximal Infizierten in 
-    #Abhängigkeit von Reproduktionswahrscheinlichkeit
-    for i in range(iter_variaton):
-        beta = beta_var[i]
-        Repro[i] = beta_var[i]/gamma
-
-        F_var = odeint(diff_sys, f_0, t_long, args=(beta, gamma))
-        S_var, I_var, R_var = F_var.T
-        I_max[i] = np.max(I_var)
+    Repro = beta_var/gamma
+    #Berechnung der maximal Infizierten in Abhängigkeit von 
+    #Reproduktionswahrscheinlichkeit mithilfe der analytischen Lösung 
+    #(Erhaltungsgröße, siehe epidemie.py). Die analytischen Werte gelten 
+    #für t -> unendlich, für R_0 nahe 1 liegt das Maximum erst nach über 
+    #1000 Tagen, daher wird zur Kontrolle bis t_kontrolle integriert.
+    I_max, _ = ep.sir_analytisch(f_0, beta_var, gamma)
+    #Kontrolle durch Integration der DGL für jedes zehnte beta 
+    #(vektorisierte Integration, siehe epidemie.py)
+    I_max_ode, _, _ = ep.sir_sweep(
+        f_0, beta_var[::10], gamma, t_max=t_kontrolle)
         
     #Arrays zur Darstellund der Belastbarkeitsgrenze des Gesungheitssystems von
     #10%
@@ -157,6 +129,9 @@ def main():
     ax2.set_ylabel('Anteil')
     #Abhängigkeit max Infizierte von Repro.rate
     ax2.plot(Repro, I_max, label='maximaler Anteil an Infizierten I')
+    #Kontrollpunkte (Integration bis t_kontrolle, analytisch t -> unendlich)
+    ax2.plot(Repro[::10], I_max_ode, ls='None', marker='x', color='k', 
+             label='Kontrolle (Integration DGL)')
     ax2.plot(x,y, ls='--', color='r', label='Belastbarkeitsgrenze')
     #Legenden
     ax1.legend(loc='best')
@@ -167,10 +142,20 @@ def main():
     #Anordnung der Plots anpassen
     fig.subplots_adjust(hspace=0.3)
     
+    if optimierung:
+        ergebnis = ep.lockdown_optimierung(f_0, beta, gamma, grenze=0.1, 
+                                           t_max=t_long[-1], prozesse=4)
+        fig_opt = plt.figure(figsize=(10, 5))
+        ep.pareto_plot(fig_opt.add_subplot(111), ergebnis, grenze=0.1)
+        if ergebnis['bester'] is not None:
+            print("Günstigster Plan unter der Belastbarkeitsgrenze:", 
+                  ergebnis['plaene'][ergebnis['bester']])
+    
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    #python 5_1_lennard_franz.py optimierung: zusätzlich Lockdownoptimierung
+    main(optimierung=(len(sys.argv) > 1 and sys.argv[1] == "optimierung"))
     
     
 # Diskussion
@@ -23,26 +23,11 @@ der Reproduktionsrate wurde beta im bereich von 0.11 bis 0.5 variiert und gamma
 konstant gehalten. 
 """
 
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.integrate import odeint  #Importe
-
-def beta_lockdown(t, beta, t_hammer, t_dance):
-    """ Funktion zur Umsetzung der Veränderung der 
-    Übertragungswahrscheinlichkeit während eines Lockdowns.
-    t: Zeitenarray
-    
-    beta: Basis Infektionswahrscheinlichkeit
-    
-    t_hammer und t_dance: Beginn und den Zeitpunkt der Lockerungen 
-    innerhalb des Lockdowns
-    """
-    if t < t_hammer:
-        return beta
-    elif t > t_hammer - 1 and t < t_dance:
-        return 0.3*beta
-    else:
-        return 0.5*beta
+from scipy.integrate import odeint
+import epidemie as ep               #Importe
 
 def diff_sys (f, t, beta, gamma, sigma):
     """Funktion zur Umsetzung des Differentialgleichungssystem des SIR-Modells. 
@@ -64,28 +49,16 @@ def diff_sys (f, t, beta, gamma, sigma):
     return dS, dI, dR, dD
 
 
-def diff_sys_lockdown (f, t, beta, gamma, sigma, t_hammer, t_dance):
-    """Funktion zur Umsetzung des Differentialgleichungssystem des SIR-Modells.
-    Analog zur Funktion diff_sys, jedoch wird kein fest gewähltes beta verwendet
-    , sondern zur Simulation eines Lockdowns die bereits definierte Funktion 
-    beta_lockdown
-    f: Verktor mit Anfangswerten 
-    t: Zeitenarray
-    beta: Infektionswahrscheinlichkeit
-    gamma: Genesungswahrscheinlichkeit
-    t_hammer und t_dance: Beginn und den Zeitpunkt der Lockerungen 
-                          innerhalb des Lockdown
-    """
-    S, I, R, D = f
-    dS = -beta_lockdown(t, beta, t_hammer, t_dance) * S * I
-    dI = beta_lockdown(t, beta, t_hammer, t_dance) * S * I - gamma * I - sigma*I
-    #analog diff_sys
-    dR = gamma*I
-    dD = sigma * I
-    return dS, dI, dR, dD
-
-def main():
-    """Hauptprogramm """
+def main(optimierung=False, stochastisch=False):
+    """Hauptprogramm 
+    
+    optimierung: zusätzlich Suche nach Lockdownplänen (Beginn, Dauer, Stärke)
+                 und Darstellung der Pareto-Front aus maximaler Last und
+                 Einschränkungstagen (siehe epidemie.lockdown_optimierung)
+    
+    stochastisch: zusätzlich Ensemble des stochastischen SIRD-Modells mit 
+                  einem Infizierten zu Beginn und Darstellung der 
+                  Quantilbänder (siehe epidemie.stochastisches_ensemble)"""
     print(__doc__)
     
     N = 80000000   #Gesamtpopulation
@@ -120,9 +93,10 @@ def main():
     S, I, R, D = F.T     #Verwendung von .T zur transponierung der Lösungsmatrix
     
     #analoges Lösen des gegebens DGL-Systems mit Berücksichtigung des Lockdowns
-    #zustätzlicher übergabe der Zeitüunkte des Lockdowns  
-    F_lock = odeint(diff_sys_lockdown, f_0, t, args=(beta, gamma, sigma, 
-                    t_hammer, t_dance))
+    #als Lockdownplan, odeint wird an den Umschaltzeiten neu gestartet
+    plan = ep.Lockdownplan([(t_hammer, 0.3), (t_dance, 0.5)])
+    F_lock = ep.loese_mit_plan(diff_sys, f_0, t, beta, plan,
+                               args=(gamma, sigma))
     S_lock, I_lock, R_lock, D_Lock = F_lock.T #analog wie zuvor
     
     #Festlegung Iterationsparamter für Darstellung der maximal Infizierten in 
@@ -133,19 +107,20 @@ def main():
     #Erstellung angepasstest Zeiten-Array da für kleine beta die Betrachtung
     #von 150 Tagen nicht ausreichend ist.
     t_long = np.linspace(0,1000,1001) 
+    #Integrationsdauer der Kontrollrechnung in Tagen
+    t_kontrolle = 5000
     
-    #Erstellung leerer Arrays für Plot
-    Repro = np.zeros(iter_variaton)
-    I_max = np.zeros(iter_variaton)
-    #Schleife zur Berechnung der maximal Infizierten in 
-    #Abhängigkeit von Reproduktionswahrscheinlichkeit
-    for i in range(iter_variaton):
-        beta = beta_var[i]
-        Repro[i] = beta_var[i]/gamma
-
-        F_var = odeint(diff_sys, f_0, t_long, args=(beta, gamma, sigma))
-        S_var, I_var, R_var, D_var = F_var.T
-        I_max[i] = np.max(I_var)
+    Repro = beta_var/gamma
+    #Berechnung der maximal Infizierten in Abhängigkeit von 
+    #Reproduktionswahrscheinlichkeit mithilfe der analytischen Lösung 
+    #(Erhaltungsgröße, siehe epidemie.py). Die analytischen Werte gelten 
+    #für t -> unendlich, für R_0 nahe 1 liegt das Maximum erst nach über 
+    #1000 Tagen, daher wird zur Kontrolle bis t_kontrolle integriert.
+    I_max, _ = ep.sir_analytisch(f_0, beta_var, gamma, sigma)
+    #Kontrolle durch Integration der DGL für jedes zehnte beta 
+    #(vektorisierte Integration, siehe epidemie.py)
+    I_max_ode, _, _ = ep.sir_sweep(
+        f_0, beta_var[::10], gamma, sigma, t_max=t_kontrolle)
         
     #Arrays zur Darstellund der Belastbarkeitsgrenze des Gesungheitssystems von
     #10%
@@ -181,6 +156,9 @@ def main():
     ax2.set_ylabel('Anteil')
     #Abhängigkeit max Infizierte von Repro.rate
     ax2.plot(Repro, I_max, label='maximaler Anteil an Infizierten I')
+    #Kontrollpunkte (Integration bis t_kontrolle, analytisch t -> unendlich)
+    ax2.plot(Repro[::10], I_max_ode, ls='None', marker='x', color='k', 
+             label='Kontrolle (Integration DGL)')
     ax2.plot(x,y, ls='--', color='r', label='Belastbarkeitsgrenze')
     #Legenden
     ax1.legend(loc='best')
@@ -191,10 +169,79 @@ def main():
     #Anordnung der Plots anpassen
     fig.subplots_adjust(hspace=0.3)
     
+    if optimierung:
+        ergebnis = ep.lockdown_optimierung(f_0, beta, gamma, sigma, grenze=0.1, 
+                                           t_max=t_long[-1], prozesse=4)
+        fig_opt = plt.figure(figsize=(10, 5))
+        ep.pareto_plot(fig_opt.add_subplot(111), ergebnis, grenze=0.1)
+        if ergebnis['bester'] is not None:
+            print("Günstigster Plan unter der Belastbarkeitsgrenze:", 
+                  ergebnis['plaene'][ergebnis['bester']])
+    
+    if stochastisch:
+        #1000 Realisierungen mit ganzzahligen Anzahlen, ausgehend von einem
+        #Infizierten (I_0*N)
+        ensemble = ep.stochastisches_ensemble(N, int(round(I_0*N)), beta, 
+                                              gamma, sigma, t, 
+                                              realisierungen=1000)
+        print("Anteil der Realisierungen mit frühem Aussterben:", 
+              ensemble['aussterbe_anteil'])
+        baender = ensemble['baender']     #Quantile 5%, 25%, 50%, 75%, 95%
+        fig_st = plt.figure(figsize=(10, 5))
+        ax4 = fig_st.add_subplot(111)
+        ax4.set_title('Stochastisches SIRD-Modell (1000 Realisierungen)')
+        ax4.set_xlabel('Zeit/ Tage')
+        ax4.set_ylabel('Anteil')
+        for gruppe, farbe, name in zip(range(4), ['g', 'r', 'b', 'k'], 
+                                       ['Susceptible', 'Infected', 
+                                        'Recovered', 'Dead']):
+            ax4.fill_between(t, baender[0, gruppe], baender[4, gruppe], 
+                             color=farbe, alpha=0.15)
+            ax4.fill_between(t, baender[1, gruppe], baender[3, gruppe], 
+                             color=farbe, alpha=0.3)
+            ax4.plot(t, baender[2, gruppe], color=farbe, 
+                     label=name + ' (Median, 50%/90%-Band)')
+        ax4.plot(t, I, ls='--', color='r', label='Infected (deterministisch)')
+        ax4.legend(loc='best')
+        ax4.grid()
+    
     plt.show()
 
 if __name__ == "__main__":
-    main()
+    #python 5_2_lennard_franz.py benchmark: Durchsatz der rechten Seite des
+    #gekoppelten SIRD-Modells in Abhängigkeit der Anzahl der Regionen
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        ep.benchmark_meta()
+    #python 5_2_lennard_franz.py fit <daten.csv> <N> [Umschaltzeiten ...]:
+    #Anpassung von beta, gamma, sigma und den Lockdownfaktoren an tägliche
+    #Fall- und Todeszahlen (Spalten tag, faelle, tote)
+    elif len(sys.argv) > 3 and sys.argv[1] == "fit":
+        tage, faelle, tote = ep.daten_laden(sys.argv[2])
+        fit = ep.sird_fit(tage, faelle, tote, float(sys.argv[3]), 
+                          [float(x) for x in sys.argv[4:]])
+        namen = ['beta', 'gamma', 'sigma', 'I_0'] + [
+            'Faktor ab Tag {}'.format(x) for x in sys.argv[4:]]
+        for name, wert, fehler in zip(namen, fit['parameter'], 
+                                      fit['standardfehler']):
+            print("{:<20}{:>12.4g} +- {:.2g}".format(name, wert, fehler))
+        plt.plot(tage, faelle, ls='None', marker='.', color='r', 
+                 label='Fälle')
+        plt.plot(tage, tote, ls='None', marker='.', color='k', 
+                 label='Tote')
+        plt.plot(tage, fit['faelle_modell'], color='r', 
+                 label='Fälle (Modell)')
+        plt.plot(tage, fit['tote_modell'], color='k', label='Tote (Modell)')
+        plt.xlabel('Tag')
+        plt.ylabel('Anzahl pro Tag')
+        plt.yscale('log')
+        plt.legend(loc='best')
+        plt.grid()
+        plt.show()
+    #python 5_2_lennard_franz.py [optimierung] [stochastisch]: zusätzlich 
+    #Lockdownoptimierung bzw. stochastisches Ensemble
+    else:
+        main(optimierung="optimierung" in sys.argv[1:], 
+             stochastisch="stochastisch" in sys.argv[1:])
     
     
 # Diskussion zur Ergänzung:
@@ -0,0 +1,911 @@
+"""Vektorisierte Lösung des SIR- bzw. SIRD-Modells für viele Parametersätze.
+
+Die Zustände aller Parametersätze werden zu einem Array der Form
+(Gruppen, Anzahl Parametersätze) zusammengefasst und gemeinsam mit festen
+Runge-Kutta-Schritten integriert. Gruppen: S, I, R (SIR) bzw. S, I, R, D
+(SIRD, Lethalität sigma > 0).
+
+Außerdem: Lockdownpläne und deren Optimierung, ein stochastisches
+SIRD-Modell (Gillespie / Tau-Leaping), ein SIRD-Modell für viele über
+eine Kontaktmatrix gekoppelte Teilpopulationen und die Anpassung der
+Parameter an beobachtete Fall- und Todeszahlen.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from scipy import sparse
+from scipy.integrate import odeint
+from scipy.optimize import least_squares
+from scipy.special import lambertw
+
+
+def diff_sys_vektor(f, t, beta, gamma, sigma=0.0):
+    """Differentialgleichungssystem des SIR- bzw. SIRD-Modells für viele
+    Parametersätze gleichzeitig.
+
+    Parameter:
+        f: Zustände der Form (3, n) für S, I, R oder (4, n) für S, I, R, D
+        t: Zeitpunkt (wird nicht benötigt, nur für einheitliche Aufrufform)
+        beta, gamma, sigma: Zahlen oder Arrays der Länge n
+    Rückgabe:
+        Array der Ableitungen mit der Form von f
+    """
+    S, I = f[0], f[1]
+    infektion = beta*S*I
+    ableitung = [-infektion, infektion - gamma*I - sigma*I, gamma*I]
+    if len(f) == 4:
+        ableitung.append(sigma*I)
+    return np.array(ableitung)
+
+
+def rk4_schritt(ableitung, f, t, dt, args):
+    """Ein Schritt des klassischen Runge-Kutta-Verfahrens 4. Ordnung."""
+    k1 = ableitung(f, t, *args)
+    k2 = ableitung(f + dt/2.0*k1, t + dt/2.0, *args)
+    k3 = ableitung(f + dt/2.0*k2, t + dt/2.0, *args)
+    k4 = ableitung(f + dt*k3, t + dt, *args)
+    return f + dt/6.0*(k1 + 2.0*k2 + 2.0*k3 + k4)
+
+
+class Lockdownplan:
+    """Zeitplan von Maßnahmen als stückweise konstanter Faktor für beta.
+
+    phasen: Liste von Paaren (Beginn in Tagen, Faktor für beta). Vor der
+    ersten Phase gilt der Faktor 1, jede Phase gilt bis zum Beginn der
+    nächsten. Der Lockdown aus 5_1 und 5_2 (Reduzierung auf 0.3*beta ab
+    t_hammer, Lockerung auf 0.5*beta ab t_dance) entspricht
+    Lockdownplan([(t_hammer, 0.3), (t_dance, 0.5)]).
+    """
+
+    def __init__(self, phasen):
+        phasen = sorted((float(t), float(faktor)) for t, faktor in phasen)
+        self.umschaltzeiten = np.array([t for t, faktor in phasen])
+        self.faktoren = np.array([faktor for t, faktor in phasen])
+
+    def __call__(self, t):
+        """Faktor für beta zum Zeitpunkt t (Zahl oder Array)."""
+        index = np.searchsorted(self.umschaltzeiten, t, side='right')
+        return np.concatenate([[1.0], self.faktoren])[index]
+
+    def __repr__(self):
+        return "Lockdownplan({})".format(
+            list(zip(self.umschaltzeiten.tolist(), self.faktoren.tolist())))
+
+    def lockdowntage(self, t_max):
+        """Anzahl der Tage bis t_max, an denen beta reduziert ist
+        (Faktor < 1)."""
+        grenzen = np.concatenate([[0.0], np.clip(self.umschaltzeiten, 0.0,
+                                                 t_max), [t_max]])
+        faktoren = np.concatenate([[1.0], self.faktoren])
+        return np.sum(np.diff(grenzen)*(faktoren < 1.0))
+
+    def kosten(self, t_max):
+        """Einschränkungskosten bis t_max: Dauer jeder Phase gewichtet mit
+        der Reduzierung von beta (1 - Faktor), d.h. ein Tag mit Faktor 0.3
+        kostet 0.7 Einschränkungstage."""
+        grenzen = np.concatenate([[0.0], np.clip(self.umschaltzeiten, 0.0,
+                                                 t_max), [t_max]])
+        faktoren = np.concatenate([[1.0], self.faktoren])
+        return np.sum(np.diff(grenzen)*np.clip(1.0 - faktoren, 0.0, None))
+
+
+def plaene_als_arrays(plaene):
+    """Umwandlung einer Liste von Lockdownplänen in zwei Arrays der Form
+    (Anzahl Pläne, maximale Anzahl Phasen) mit Umschaltzeiten und Faktoren.
+    Fehlende Phasen werden mit Umschaltzeit unendlich aufgefüllt."""
+    anzahl_phasen = max([len(plan.umschaltzeiten) for plan in plaene] + [1])
+    umschaltzeiten = np.full((len(plaene), anzahl_phasen), np.inf)
+    faktoren = np.ones((len(plaene), anzahl_phasen))
+    for i, plan in enumerate(plaene):
+        umschaltzeiten[i, :len(plan.umschaltzeiten)] = plan.umschaltzeiten
+        faktoren[i, :len(plan.faktoren)] = plan.faktoren
+    return umschaltzeiten, faktoren
+
+
+def loese_mit_plan(diff_sys, f_0, t, beta, plan, args=(), rtol=1e-10,
+                   atol=1e-14):
+    """Lösung von diff_sys(f, t, beta, *args) mit odeint für einen
+    Lockdownplan, wobei an jeder Umschaltzeit neu gestartet wird.
+
+    Innerhalb jeder Phase ist beta konstant, sodass der adaptive Löser
+    nicht über die Sprünge von beta hinweg rechnen muss.
+
+    Parameter:
+        diff_sys: Differentialgleichungssystem mit konstantem beta
+        f_0: Anfangswerte
+        t: Array der Ausgabezeitpunkte (aufsteigend)
+        beta: Basis-Infektionswahrscheinlichkeit
+        plan: Lockdownplan
+        args: weitere Argumente von diff_sys (z.B. gamma, sigma)
+        rtol, atol: Toleranzen für odeint; atol muss deutlich kleiner als
+             der Anfangsanteil der Infizierten (1/N) sein
+    Rückgabe:
+        Lösungsmatrix der Form (len(t), Anzahl Gruppen) wie bei odeint
+    """
+    return _loese_phasenweise(
+        diff_sys, f_0, t, plan.umschaltzeiten,
+        lambda t_a: (beta*plan(t_a),) + tuple(args), rtol, atol)
+
+
+def _loese_phasenweise(diff_sys, f_0, t, umschaltzeiten, argumente, rtol,
+                       atol):
+    """Lösung mit odeint, neu gestartet an jeder Umschaltzeit innerhalb von
+    t. argumente(t_a) liefert die in der Phase ab t_a konstanten
+    Argumente von diff_sys."""
+    umschaltzeiten = np.unique(umschaltzeiten)
+    grenzen = np.concatenate([[t[0]], umschaltzeiten[
+        (umschaltzeiten > t[0]) & (umschaltzeiten < t[-1])], [t[-1]]])
+    F = np.zeros((len(t), len(f_0)))
+    f = np.asarray(f_0, dtype=float)
+    for t_a, t_b in zip(grenzen[:-1], grenzen[1:]):
+        #Ausgabezeitpunkte innerhalb der Phase (t_b gehört zur nächsten)
+        innen = (t >= t_a) & ((t < t_b) | (t_b == t[-1]))
+        t_phase = np.concatenate([[t_a], t[innen], [t_b]])
+        loesung = odeint(diff_sys, f, t_phase, args=argumente(t_a),
+                         rtol=rtol, atol=atol)
+        F[innen] = loesung[1:-1]
+        f = loesung[-1]
+    return F
+
+
+def sir_sweep(f_0, beta, gamma, sigma=0.0, t_max=1000.0, dt=0.1,
+              blockgroesse=100000, umschaltzeiten=None, faktoren=None):
+    """Berechnung von Maximum und Zeitpunkt des Maximums der Infizierten
+    sowie der Endgröße der Epidemie für viele Parametersätze.
+
+    Anstatt den zeitlichen Verlauf zu speichern, werden Maximum und
+    Zeitpunkt während der Integration mitgeführt. Der Zeitpunkt wird durch
+    eine Parabel durch die drei Werte um das Maximum verfeinert.
+
+    Optional kann jeder Parametersatz einen eigenen Lockdownplan besitzen
+    (Arrays aus plaene_als_arrays). Liegt eine Umschaltzeit innerhalb eines
+    Schritts, wird der Schritt dort geteilt, sodass die Integration genau
+    an der Umschaltzeit mit dem neuen beta fortgesetzt wird. Phasen müssen
+    dafür länger als dt sein.
+
+    Parameter:
+        f_0: Anfangswerte (S_0, I_0, R_0) bzw. (S_0, I_0, R_0, D_0) als
+             Anteile, für alle Parametersätze gleich
+        beta, gamma, sigma: Zahlen oder Arrays (werden gegeneinander
+             gebroadcastet, z.B. Gitter aus np.meshgrid)
+        t_max: Ende der Integration in Tagen
+        dt: Schrittweite in Tagen
+        blockgroesse: maximale Anzahl gleichzeitig integrierter
+             Parametersätze
+        umschaltzeiten, faktoren: optional, Arrays der Form
+             (Anzahl Parametersätze oder 1, Anzahl Phasen); bei nur einem
+             Parametersatz wird dieser für alle Pläne verwendet
+    Rückgabe:
+        I_max: maximaler Anteil an Infizierten
+        t_peak: Zeitpunkt des Maximums in Tagen
+        endgroesse: Anteil der insgesamt Infizierten 1 - S(t_max)
+        (jeweils Arrays in der gebroadcasteten Form der Parameter)
+    """
+    beta, gamma, sigma = np.broadcast_arrays(np.asarray(beta, dtype=float),
+                                             np.asarray(gamma, dtype=float),
+                                             np.asarray(sigma, dtype=float))
+    form = beta.shape
+    beta, gamma, sigma = beta.ravel(), gamma.ravel(), sigma.ravel()
+    anzahl_schritte = int(round(t_max/dt))
+
+    if umschaltzeiten is None:
+        umschaltzeiten = np.full((1, 1), np.inf)
+        faktoren = np.ones((1, 1))
+    elif beta.size == 1:
+        #ein Parametersatz für viele Pläne
+        form = (len(umschaltzeiten),)
+        beta, gamma, sigma = (np.repeat(x, len(umschaltzeiten))
+                              for x in (beta, gamma, sigma))
+    umschaltzeiten = np.broadcast_to(umschaltzeiten,
+                                     (beta.size, np.shape(umschaltzeiten)[1]))
+    faktoren = np.broadcast_to(faktoren, umschaltzeiten.shape)
+    #Faktor vor der ersten Phase ist 1
+    faktoren = np.concatenate([np.ones((beta.size, 1)), faktoren], axis=1)
+
+    I_max = np.zeros(beta.size)
+    t_peak = np.zeros(beta.size)
+    endgroesse = np.zeros(beta.size)
+
+    for start in range(0, beta.size, blockgroesse):
+        teil = slice(start, start + blockgroesse)
+        b, g, s = beta[teil], gamma[teil], sigma[teil]
+        zeiten, fak = umschaltzeiten[teil], faktoren[teil]
+        n = len(b)
+        zeilen = np.arange(n)
+        f = np.repeat(np.asarray(f_0, dtype=float)[:, None], n, axis=1)
+
+        maximum = f[1].copy()                   #I(t_peak) und Nachbarn
+        links = np.full(n, -np.inf)
+        rechts = np.full(n, -np.inf)
+        index = np.zeros(n, dtype=int)
+        for k in range(1, anzahl_schritte + 1):
+            I_alt = f[1]
+            t = (k-1)*dt
+            #aktuelle Phase und Zeit bis zur nächsten Umschaltung
+            phase = np.sum(zeiten <= t + 1e-9*dt, axis=1)
+            naechste = np.concatenate([zeiten, np.full((n, 1), np.inf)],
+                                      axis=1)[zeilen, phase]
+            dt_1 = np.clip(naechste - t, 0.0, dt)
+            f = rk4_schritt(diff_sys_vektor, f, t, dt_1,
+                            (b*fak[zeilen, phase], g, s))
+            if np.any(dt_1 < dt):
+                #Rest des Schritts nach der Umschaltung mit neuem beta
+                phase = np.minimum(phase + 1, fak.shape[1] - 1)
+                f = rk4_schritt(diff_sys_vektor, f, t + dt_1, dt - dt_1,
+                                (b*fak[zeilen, phase], g, s))
+            #rechter Nachbar des bisherigen Maximums
+            rechts = np.where(index == k-1, f[1], rechts)
+            neu = f[1] > maximum
+            links = np.where(neu, I_alt, links)
+            maximum = np.where(neu, f[1], maximum)
+            rechts = np.where(neu, -np.inf, rechts)
+            index = np.where(neu, k, index)
+
+        #Verfeinerung durch Parabel durch (links, maximum, rechts)
+        nenner = links - 2.0*maximum + rechts
+        innen = np.isfinite(nenner) & (nenner < 0)
+        verschiebung = np.zeros(n)
+        korrektur = np.zeros(n)
+        verschiebung[innen] = (0.5*(links[innen] - rechts[innen])
+                               / nenner[innen])
+        korrektur[innen] = (0.25*(links[innen] - rechts[innen])
+                            * verschiebung[innen])
+        I_max[teil] = maximum - korrektur
+        t_peak[teil] = (index + verschiebung)*dt
+        endgroesse[teil] = 1.0 - f[0]
+
+    return I_max.reshape(form), t_peak.reshape(form), endgroesse.reshape(form)
+
+
+def sir_analytisch(f_0, beta, gamma, sigma=0.0):
+    """Analytische Berechnung des maximalen Anteils an Infizierten und der
+    Endgröße der Epidemie ohne Integration der Differentialgleichungen.
+
+    Mit R_0 = beta/(gamma + sigma) ist S + I - ln(S)/R_0 eine Erhaltungsgröße.
+    Das Maximum von I liegt bei S = 1/R_0:
+        I_max = S_0 + I_0 - 1/R_0 - ln(R_0*S_0)/R_0      (für R_0*S_0 > 1)
+    Der Anteil der Anfälligen nach Ende der Epidemie folgt mit der
+    Lambertschen W-Funktion:
+        S_inf = -W(-R_0*S_0*exp(-R_0*(S_0 + I_0)))/R_0
+    Für das SIRD-Modell gilt dasselbe mit der Summe gamma + sigma.
+
+    Beide Größen sind Grenzwerte für t -> unendlich. Für R_0*S_0 nahe 1
+    wird das Maximum erst nach sehr langer Zeit erreicht (z.B. nach ca.
+    1400 Tagen für R_0 = 1.1 und I_0 = 1/8e7), ein Vergleich mit einer
+    Integration (sir_sweep) benötigt dann ein entsprechend großes t_max.
+    Für R_0 = 0 ist die Endgröße 0.
+
+    Parameter:
+        f_0: Anfangswerte (S_0, I_0, ...) als Anteile
+        beta, gamma, sigma: Zahlen oder Arrays (werden gebroadcastet)
+    Rückgabe:
+        I_max: maximaler Anteil an Infizierten
+        endgroesse: Anteil der insgesamt Infizierten 1 - S_inf
+    """
+    S_0, I_0 = f_0[0], f_0[1]
+    R_0 = np.asarray(beta, dtype=float)/(np.asarray(gamma, dtype=float)
+                                         + np.asarray(sigma, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        I_max = np.where(R_0*S_0 > 1.0,
+                         S_0 + I_0 - 1.0/R_0 - np.log(R_0*S_0)/R_0, I_0)
+        S_inf = -lambertw(-R_0*S_0*np.exp(-R_0*(S_0 + I_0))).real/R_0
+    #ohne Ansteckung (R_0 = 0) bleibt S konstant
+    endgroesse = np.where(R_0 > 0.0, 1.0 - S_inf, 0.0)
+    return I_max, endgroesse
+
+
+#Zwischenspeicher bereits berechneter Lockdownpläne:
+#Schlüssel (siehe plan_schluessel) -> (I_max, t_peak, endgroesse)
+#begrenzt auf SPEICHER_GROESSE Einträge, bei Überlauf werden die am längsten
+#nicht verwendeten Pläne verworfen (LRU)
+SPEICHER_GROESSE = 100000
+_PLAN_SPEICHER = OrderedDict()
+
+
+def plan_schluessel(f_0, beta, gamma, sigma, plan, t_max, dt):
+    """Hash aller Größen, die das Ergebnis eines Lockdownplans bestimmen."""
+    schluessel = repr((np.asarray(f_0, dtype=float).tolist(), float(beta),
+                       float(gamma), float(sigma), plan.umschaltzeiten.tolist(),
+                       plan.faktoren.tolist(), float(t_max), float(dt)))
+    return hashlib.sha1(schluessel.encode()).hexdigest()
+
+
+def _plaene_block(f_0, beta, gamma, sigma, umschaltzeiten, faktoren, t_max,
+                  dt):
+    """Auswertung eines Blocks von Plänen (eigene Funktion, damit sie in
+    einem Prozesspool ausgeführt werden kann)."""
+    return np.array(sir_sweep(f_0, beta, gamma, sigma, t_max=t_max, dt=dt,
+                              umschaltzeiten=umschaltzeiten,
+                              faktoren=faktoren))
+
+
+def plaene_auswerten(f_0, beta, gamma, plaene, sigma=0.0, t_max=1000.0,
+                     dt=0.1, prozesse=1, blockgroesse=2000):
+    """Berechnung von Maximum, Zeitpunkt des Maximums und Endgröße für eine
+    Liste von Lockdownplänen bei festen Parametern.
+
+    Bereits berechnete Pläne werden aus dem Zwischenspeicher (höchstens
+    SPEICHER_GROESSE Pläne) gelesen, die übrigen werden in Blöcken vektorisiert mit sir_sweep integriert, bei
+    prozesse > 1 verteilt auf mehrere Prozesse.
+
+    Rückgabe:
+        Array der Form (3, Anzahl Pläne) mit I_max, t_peak, endgroesse
+    """
+    schluessel = [plan_schluessel(f_0, beta, gamma, sigma, plan, t_max, dt)
+                  for plan in plaene]
+    werte = {}
+    for s in schluessel:
+        if s in _PLAN_SPEICHER:
+            _PLAN_SPEICHER.move_to_end(s)
+            werte[s] = _PLAN_SPEICHER[s]
+    offen = sorted({s: i for i, s in enumerate(schluessel)
+                    if s not in werte}.items(), key=lambda x: x[1])
+    bloecke = [offen[i:i + blockgroesse]
+               for i in range(0, len(offen), blockgroesse)]
+    argumente = [(f_0, beta, gamma, sigma)
+                 + plaene_als_arrays([plaene[i] for s, i in block])
+                 + (t_max, dt) for block in bloecke]
+    if prozesse > 1 and len(bloecke) > 1:
+        with ProcessPoolExecutor(max_workers=prozesse) as pool:
+            ergebnisse = list(pool.map(_plaene_block, *zip(*argumente)))
+    else:
+        ergebnisse = [_plaene_block(*arg) for arg in argumente]
+    for block, ergebnis in zip(bloecke, ergebnisse):
+        for (s, i), spalte in zip(block, ergebnis.T):
+            werte[s] = _PLAN_SPEICHER[s] = tuple(spalte)
+    while len(_PLAN_SPEICHER) > SPEICHER_GROESSE:
+        _PLAN_SPEICHER.popitem(last=False)
+    return np.array([werte[s] for s in schluessel]).T.reshape(
+        3, len(plaene))
+
+
+def pareto_front(last, kosten):
+    """Indizes der nicht dominierten Punkte (kein anderer Punkt hat weder
+    höhere Last noch höhere Kosten und ist in einem von beiden besser),
+    sortiert nach aufsteigenden Kosten."""
+    reihenfolge = np.lexsort((last, kosten))
+    front = []
+    beste_last = np.inf
+    for i in reihenfolge:
+        if last[i] < beste_last:
+            front.append(i)
+            beste_last = last[i]
+    return np.array(front, dtype=int)
+
+
+def lockdown_optimierung(f_0, beta, gamma, sigma=0.0, beginn=None, dauer=None,
+                         staerke=None, grenze=0.1, t_max=1000.0, dt=0.1,
+                         prozesse=1):
+    """Suche nach Lockdownplänen, die das Maximum der Infizierten unter der
+    Belastbarkeitsgrenze halten und dabei möglichst wenig einschränken.
+
+    Untersucht werden alle Kombinationen eines einzelnen Lockdowns mit
+    Beginn, Dauer und Stärke (Faktor für beta) aus den gegebenen Arrays,
+    nach dem Lockdown gilt wieder beta. Die Kosten eines Plans sind die
+    Einschränkungstage (siehe Lockdownplan.kosten).
+
+    Rückgabe: Dictionary mit
+        plaene: Liste aller untersuchten Lockdownpläne
+        I_max, t_peak, kosten, lockdowntage: Arrays pro Plan
+        front: Indizes der Pareto-Front aus I_max und kosten
+        bester: Index des günstigsten Plans mit I_max <= grenze
+                (None, falls kein Plan die Grenze einhält)
+    """
+    if beginn is None:
+        beginn = np.arange(0.0, 101.0, 5.0)
+    if dauer is None:
+        dauer = np.arange(10.0, 201.0, 10.0)
+    if staerke is None:
+        staerke = np.linspace(0.2, 0.9, 8)
+    plaene = [Lockdownplan([(t_b, faktor), (t_b + d, 1.0)])
+              for t_b in beginn for d in dauer for faktor in staerke]
+    I_max, t_peak, _ = plaene_auswerten(
+        f_0, beta, gamma, plaene, sigma, t_max=t_max, dt=dt,
+        prozesse=prozesse)
+    kosten = np.array([plan.kosten(t_max) for plan in plaene])
+    zulaessig = np.flatnonzero(I_max <= grenze)
+    bester = (zulaessig[np.argmin(kosten[zulaessig])] if len(zulaessig)
+              else None)
+    return {'plaene': plaene, 'I_max': I_max, 't_peak': t_peak,
+            'kosten': kosten,
+            'lockdowntage': np.array([plan.lockdowntage(t_max)
+                                      for plan in plaene]),
+            'front': pareto_front(I_max, kosten), 'bester': bester}
+
+
+def pareto_plot(ax, ergebnis, grenze=0.1):
+    """Darstellung der Ergebnisse von lockdown_optimierung in ax: alle
+    untersuchten Pläne, die Pareto-Front, die Belastbarkeitsgrenze und der
+    günstigste zulässige Plan."""
+    front = ergebnis['front']
+    ax.set_title('Lockdownpläne: maximale Last und Einschränkungstage')
+    ax.set_xlabel('Einschränkungstage (Dauer * (1 - Faktor))')
+    ax.set_ylabel('maximaler Anteil an Infizierten')
+    ax.plot(ergebnis['kosten'], ergebnis['I_max'], ls='None', marker='.',
+            ms=2, color='0.6', label='untersuchte Pläne')
+    ax.plot(ergebnis['kosten'][front], ergebnis['I_max'][front],
+            drawstyle='steps-post', color='k', label='Pareto-Front')
+    ax.axhline(grenze, ls='--', color='r', label='Belastbarkeitsgrenze')
+    if ergebnis['bester'] is not None:
+        bester = ergebnis['bester']
+        ax.plot(ergebnis['kosten'][bester], ergebnis['I_max'][bester],
+                ls='None', marker='o', color='r',
+                label='günstigster zulässiger Plan')
+    ax.legend(loc='best')
+    ax.grid()
+
+def _gillespie_intervall(zustand, t_ende, aktiv, beta, gamma, sigma, N, rng):
+    """Exakte stochastische Simulation (Gillespie) der Realisierungen mit
+    aktiv == True von t = 0 bis t_ende (Zeit relativ zum Intervallbeginn).
+
+    zustand: ganzzahlige Anzahlen der Form (4, n) für S, I, R, D, wird
+             direkt verändert. Die Ereignisse aller aktiven Realisierungen
+             werden gemeinsam gezogen, jede besitzt ihre eigene Zeit.
+    """
+    t = np.zeros(len(aktiv))
+    aktiv = aktiv.copy()
+    while np.any(aktiv):
+        S, I = zustand[0, aktiv], zustand[1, aktiv]
+        raten = np.array([beta*S*I/N, gamma*I, sigma*I])
+        gesamt = raten.sum(axis=0)
+        #ohne Infizierte passiert nichts mehr (Wartezeit unendlich)
+        with np.errstate(divide='ignore'):
+            wartezeit = rng.exponential(1.0, len(gesamt))/gesamt
+        t[aktiv] += wartezeit
+        index = np.flatnonzero(aktiv)
+        fertig = t[aktiv] > t_ende
+        aktiv[index[fertig]] = False
+        index, raten = index[~fertig], raten[:, ~fertig]
+        #Auswahl des Ereignisses proportional zu seiner Rate
+        zufall = rng.random(len(index))*raten.sum(axis=0)
+        infektion = zufall < raten[0]
+        genesung = ~infektion & (zufall < raten[0] + raten[1])
+        tod = ~infektion & ~genesung
+        zustand[0, index] -= infektion
+        zustand[1, index] += infektion.astype(zustand.dtype) - genesung - tod
+        zustand[2, index] += genesung
+        zustand[3, index] += tod
+
+
+def _tau_intervall(zustand, t_ende, aktiv, beta, gamma, sigma, N, tau, rng):
+    """Tau-Leaping der Realisierungen mit aktiv == True über die Dauer
+    t_ende mit Schrittweite höchstens tau.
+
+    Die Anzahl der Übergänge pro Schritt wird binomialverteilt gezogen
+    (Wahrscheinlichkeit 1 - exp(-Rate*tau) pro Person), sodass keine Gruppe
+    negativ werden kann.
+    """
+    schritte = max(1, int(np.ceil(t_ende/tau - 1e-9)))
+    tau = t_ende/schritte
+    for k in range(schritte):
+        S, I = zustand[0, aktiv], zustand[1, aktiv]
+        infektion = rng.binomial(S, -np.expm1(-beta*I/N*tau))
+        abgang = rng.binomial(I, -np.expm1(-(gamma + sigma)*tau))
+        tod = rng.binomial(abgang, sigma/(gamma + sigma))
+        zustand[0, aktiv] = S - infektion
+        zustand[1, aktiv] = I + infektion - abgang
+        zustand[2, aktiv] += abgang - tod
+        zustand[3, aktiv] += tod
+
+
+def stochastisch_block(N, I_0, beta, gamma, sigma, t, anzahl, saat,
+                       schwelle=100, tau=0.01, bins=4000):
+    """Simulation von anzahl Realisierungen des stochastischen SIRD-Modells
+    auf den Zeitpunkten t.
+
+    Solange eine Realisierung weniger als schwelle Infizierte besitzt, wird
+    sie im folgenden Zeitintervall exakt mit dem Gillespie-Algorithmus
+    simuliert, sonst mit Tau-Leaping. Es werden keine Pfade gespeichert,
+    sondern für jede Gruppe und jeden Zeitpunkt ein Histogramm der Anzahlen
+    (siehe histogramm_klassen).
+
+    saat: np.random.SeedSequence des Blocks (reproduzierbar unabhängig von
+          der Verteilung der Blöcke auf Prozesse)
+    Rückgabe:
+        histogramme: Array der Form (4, len(t), bins)
+        ausgestorben: Anzahl der Realisierungen, in denen insgesamt weniger
+                      als 1% der Bevölkerung infiziert wurden
+    """
+    rng = np.random.default_rng(saat)
+    zustand = np.zeros((4, anzahl), dtype=np.int64)
+    zustand[0], zustand[1] = N - I_0, I_0
+    histogramme = np.zeros((4, len(t), bins), dtype=np.int64)
+
+    for k in range(len(t)):
+        if k > 0:
+            klein = zustand[1] < schwelle
+            if np.any(klein):
+                _gillespie_intervall(zustand, t[k] - t[k-1], klein, beta,
+                                     gamma, sigma, N, rng)
+            if not np.all(klein):
+                _tau_intervall(zustand, t[k] - t[k-1], ~klein, beta, gamma,
+                               sigma, N, tau, rng)
+        klasse = histogramm_klassen(zustand, N, bins)
+        for gruppe in range(4):
+            histogramme[gruppe, k] += np.bincount(klasse[gruppe],
+                                                  minlength=bins)
+    ausgestorben = np.sum(N - zustand[0] < 0.01*N)
+    return histogramme, ausgestorben
+
+
+def _klassenkanten(N, bins):
+    """Klassengrenzen für Anzahlen m zwischen 0 und N/2: zunächst eine
+    Klasse pro ganzer Zahl 0, 1, ..., dann logarithmisch gleichmäßig bis
+    N/2. Es werden bins//2 Klassen verwendet."""
+    haelfte = bins//2
+    ganzzahlig = min(haelfte//20, int(N//2))
+    kanten = np.concatenate([np.arange(ganzzahlig, dtype=float),
+                             np.geomspace(max(ganzzahlig, 1), N//2 + 1,
+                                          haelfte - ganzzahlig + 1)])
+    return kanten
+
+
+def histogramm_klassen(anzahl, N, bins):
+    """Klassen der Histogramme für Anzahlen zwischen 0 und N.
+
+    Die untere Hälfte der Klassen unterteilt Anzahlen bis N/2 (siehe
+    _klassenkanten), die obere Hälfte spiegelbildlich N - Anzahl für
+    Anzahlen über N/2. Damit werden sowohl einzelne Infizierte als auch
+    Anteile nahe 1 (z.B. S = N - 1 zu Beginn) exakt aufgelöst.
+    """
+    kanten = _klassenkanten(N, bins)
+    oben = anzahl > N//2
+    m = np.where(oben, N - anzahl, anzahl)
+    klasse = np.minimum(np.searchsorted(kanten, m, side='right') - 1,
+                        len(kanten) - 2)
+    return np.where(oben, bins - 1 - klasse, klasse).astype(np.int64)
+
+
+def quantile_aus_histogramm(histogramme, quantile, N):
+    """Quantile der Anteile aus Histogrammen mit den Klassen aus
+    histogramm_klassen (letzte Achse), innerhalb einer Klasse logarithmisch
+    interpoliert. Klassen, die höchstens eine ganze Zahl enthalten, liefern
+    genau diese Zahl.
+
+    Rückgabe: Array der Form (len(quantile),) + histogramme.shape[:-1]
+    """
+    bins = histogramme.shape[-1]
+    kanten = _klassenkanten(N, bins)
+    kumuliert = np.cumsum(histogramme, axis=-1)
+    gesamt = kumuliert[..., -1:]
+    ergebnis = []
+    for q in quantile:
+        ziel = q*gesamt
+        klasse = np.minimum(np.sum(kumuliert < ziel, axis=-1), bins - 1)
+        unter = np.take_along_axis(kumuliert, klasse[..., None], -1) - \
+            np.take_along_axis(histogramme, klasse[..., None], -1)
+        anzahl = np.take_along_axis(histogramme, klasse[..., None], -1)
+        anteil = np.divide(ziel - unter, anzahl, out=np.zeros(anzahl.shape),
+                           where=anzahl > 0)[..., 0]
+        #obere Hälfte: Klasse und Richtung für m = N - Anzahl spiegeln
+        oben = klasse >= bins//2
+        j = np.where(oben, bins - 1 - klasse, klasse)
+        anteil = np.where(oben, 1.0 - anteil, anteil)
+        links, rechts = kanten[j], kanten[j + 1]
+        m = np.where(rechts - links <= 1.0, np.ceil(links),
+                     np.maximum(links, 1.0)*(rechts/np.maximum(links, 1.0))
+                     ** anteil)
+        ergebnis.append(np.where(oben, N - m, m)/N)
+    return np.array(ergebnis)
+
+
+def stochastisches_ensemble(N, I_0, beta, gamma, sigma, t, realisierungen=1000,
+                            blockgroesse=250, prozesse=None, seed=0,
+                            quantile=(0.05, 0.25, 0.5, 0.75, 0.95),
+                            schwelle=100, tau=0.01, bins=4000):
+    """Ensemble von Realisierungen des stochastischen SIRD-Modells, verteilt
+    in Blöcken auf mehrere Prozesse.
+
+    Jeder Block erhält einen eigenen Zufallsstrom aus
+    np.random.SeedSequence(seed).spawn, das Ergebnis hängt daher nur von
+    seed und blockgroesse ab, nicht von der Anzahl der Prozesse. Die
+    Histogramme der Blöcke werden beim Eintreffen zusammengeführt, die
+    Pfade der Realisierungen werden nie gespeichert.
+
+    Parameter:
+        N, I_0: Gesamtpopulation und Anzahl der Infizierten zu Beginn
+        beta, gamma, sigma: Parameter wie in diff_sys_vektor
+        t: Array der Ausgabezeitpunkte in Tagen (beginnend bei 0)
+        prozesse: Anzahl der Prozesse (ohne Angabe Anzahl der CPU-Kerne,
+                  1: ohne Prozesspool)
+        quantile, schwelle, tau, bins: siehe stochastisch_block und
+                  quantile_aus_histogramm
+    Rückgabe: Dictionary mit
+        quantile: die berechneten Quantile
+        baender: Array der Form (len(quantile), 4, len(t)) der Anteile
+                 von S, I, R, D
+        aussterbe_anteil: Anteil der Realisierungen mit frühem Aussterben
+    """
+    anzahlen = [min(blockgroesse, realisierungen - start)
+                for start in range(0, realisierungen, blockgroesse)]
+    saaten = np.random.SeedSequence(seed).spawn(len(anzahlen))
+    argumente = [(N, I_0, beta, gamma, sigma, t, anzahl, saat, schwelle, tau,
+                  bins) for anzahl, saat in zip(anzahlen, saaten)]
+    histogramme = np.zeros((4, len(t), bins), dtype=np.int64)
+    ausgestorben = 0
+    if prozesse == 1:
+        ergebnisse = (stochastisch_block(*arg) for arg in argumente)
+        for histogramm, aus in ergebnisse:
+            histogramme += histogramm
+            ausgestorben += aus
+    else:
+        with ProcessPoolExecutor(max_workers=prozesse) as pool:
+            auftraege = [pool.submit(stochastisch_block, *arg)
+                         for arg in argumente]
+            for auftrag in as_completed(auftraege):
+                histogramm, aus = auftrag.result()
+                histogramme += histogramm
+                ausgestorben += aus
+    return {'quantile': np.array(quantile),
+            'baender': quantile_aus_histogramm(histogramme, quantile, N),
+            'aussterbe_anteil': ausgestorben/realisierungen}
+
+
+def diff_sys_meta(f, t, kontakt, gamma, sigma=0.0, faktor=1.0):
+    """Differentialgleichungssystem des SIRD-Modells für K gekoppelte
+    Teilpopulationen (Altersgruppen oder Regionen).
+
+    Der Zustand ist ein flaches Array der Länge 4*K mit den Anteilen
+    (S_1..S_K, I_1..I_K, R_1..R_K, D_1..D_K) bezogen auf die jeweilige
+    Teilpopulation. Die Infektionsrate in Teilpopulation i ist
+        lambda_i = faktor_i * sum_j kontakt_ij * I_j,
+    kontakt enthält also beta und darf eine dünn besetzte Matrix
+    (scipy.sparse) sein, sodass die Kopplung ein Matrix-Vektor-Produkt ist.
+
+    Parameter:
+        f: Zustand der Länge 4*K
+        t: Zeitpunkt (wird nicht benötigt)
+        kontakt: Kontaktmatrix der Form (K, K), dicht oder scipy.sparse
+        gamma, sigma: Zahlen oder Arrays der Länge K
+        faktor: Faktor für die Infektionsrate (Zahl oder Array der Länge K,
+                z.B. aus plan_faktoren)
+    Rückgabe:
+        Array der Ableitungen der Länge 4*K
+    """
+    S, I = f.reshape(4, -1)[:2]
+    infektion = faktor*S*(kontakt @ I)
+    abgang = gamma*I
+    tod = sigma*I
+    return np.concatenate([-infektion, infektion - abgang - tod, abgang,
+                           tod])
+
+
+def plan_faktoren(t, umschaltzeiten, faktoren):
+    """Faktoren aller Teilpopulationen zum Zeitpunkt t für Lockdownpläne
+    in der Form von plaene_als_arrays (eine Zeile pro Teilpopulation)."""
+    phase = np.sum(umschaltzeiten <= t, axis=1)
+    return np.concatenate([np.ones((len(faktoren), 1)), faktoren],
+                          axis=1)[np.arange(len(faktoren)), phase]
+
+
+def loese_meta(f_0, t, kontakt, gamma, sigma=0.0, plaene=None, rtol=1e-8,
+               atol=1e-12):
+    """Lösung des gekoppelten SIRD-Modells mit odeint.
+
+    plaene: optional Liste von K Lockdownplänen (einer pro
+            Teilpopulation). Die Integration wird an jeder Umschaltzeit
+            eines Plans neu gestartet, dazwischen sind alle Faktoren konstant.
+            Der Faktor verringert die Infektionsrate der Ansteckbaren der
+            jeweiligen Teilpopulation.
+    Rückgabe:
+        Lösungsmatrix der Form (len(t), 4*K)
+    """
+    if plaene is None:
+        plaene = [Lockdownplan([])]*(len(f_0)//4)
+    umschaltzeiten, faktoren = plaene_als_arrays(plaene)
+    return _loese_phasenweise(
+        diff_sys_meta, f_0, t, umschaltzeiten[np.isfinite(umschaltzeiten)],
+        lambda t_a: (kontakt, gamma, sigma,
+                     plan_faktoren(t_a, umschaltzeiten, faktoren)),
+        rtol, atol)
+
+
+def kontakt_nachbarn(K, beta, kopplung=0.01):
+    """Dünn besetzte Kontaktmatrix für K Regionen auf einem Ring: ein
+    Anteil 1 - kopplung der Kontakte findet in der eigenen Region statt,
+    je kopplung/2 in den beiden Nachbarregionen."""
+    i = np.arange(K)
+    zeilen = np.concatenate([i, i, i])
+    spalten = np.concatenate([i, (i + 1) % K, (i - 1) % K])
+    werte = np.concatenate([np.full(K, beta*(1.0 - kopplung)),
+                            np.full(2*K, beta*kopplung/2.0)])
+    #bei K = 1 und K = 2 fallen Einträge zusammen und werden addiert
+    return sparse.coo_matrix((werte, (zeilen, spalten)),
+                             shape=(K, K)).tocsr()
+
+
+def benchmark_meta(anzahlen=(10, 100, 1000, 10000, 100000), dauer=0.5):
+    """Durchsatz der rechten Seite diff_sys_meta in Abhängigkeit der Anzahl
+    der Teilpopulationen K, für die dünn besetzte Kontaktmatrix aus
+    kontakt_nachbarn und (bis K = 2000) zum Vergleich als dichte Matrix.
+
+    Ausgegeben werden Auswertungen pro Sekunde und Teilpopulationen pro
+    Sekunde (Auswertungen * K), jeweils gemessen über etwa dauer Sekunden.
+    """
+    def durchsatz(kontakt, f):
+        anzahl = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < dauer:
+            diff_sys_meta(f, 0.0, kontakt, 0.1, 0.01)
+            anzahl += 1
+        return anzahl/(time.perf_counter() - start)
+
+    print("{:>8}{:>16}{:>18}{:>16}".format(
+        "K", "dünn [1/s]", "dünn [K/s]", "dicht [1/s]"))
+    for K in anzahlen:
+        kontakt = kontakt_nachbarn(K, 0.5)
+        f = np.concatenate([np.full(K, 0.99), np.full(K, 0.01),
+                            np.zeros(2*K)])
+        duenn = durchsatz(kontakt, f)
+        dicht = durchsatz(kontakt.toarray(), f) if K <= 2000 else np.nan
+        print("{:>8}{:>16.0f}{:>18.3e}{:>16.0f}".format(K, duenn, duenn*K,
+                                                         dicht))
+
+
+def daten_laden(datei):
+    """Einlesen täglicher Fall- und Todeszahlen aus einer CSV-Datei mit
+    Kopfzeile und den Spalten tag, faelle, tote (neue Fälle bzw. Tote seit
+    der vorherigen Zeile).
+
+    Rückgabe: Arrays tage, faelle, tote
+    """
+    daten = np.genfromtxt(datei, delimiter=',', names=True)
+    return daten['tag'], daten['faelle'], daten['tote']
+
+
+def _sensitivitaet_sys(z, t, beta, gamma, sigma, faktoren, phase):
+    """SIRD-Modell mit Vorwärts-Sensitivitätsgleichungen ds/dt = J s + df/dp
+    für die Parameter p = (beta, gamma, sigma, I_0, faktoren...).
+
+    z enthält den Zustand y = (S, I, R, D) gefolgt von der Matrix
+    s = dy/dp der Form (4, Anzahl Parameter). In der Phase phase gilt
+    beta_eff = beta*faktoren[phase - 1] (phase 0: vor dem ersten Lockdown).
+    """
+    S, I = z[0], z[1]
+    s = z[4:].reshape(4, -1)
+    faktor = 1.0 if phase == 0 else faktoren[phase - 1]
+    b = beta*faktor
+    jacobi = np.array([[-b*I, -b*S, 0.0, 0.0],
+                       [b*I, b*S - gamma - sigma, 0.0, 0.0],
+                       [0.0, gamma, 0.0, 0.0],
+                       [0.0, sigma, 0.0, 0.0]])
+    ds = jacobi @ s
+    infektion = S*I
+    ds[0, 0] -= faktor*infektion
+    ds[1, 0] += faktor*infektion
+    ds[1, 1:3] -= I
+    ds[2, 1] += I
+    ds[3, 2] += I
+    if phase > 0:
+        ds[0, 3 + phase] -= beta*infektion
+        ds[1, 3 + phase] += beta*infektion
+    dy = [-b*infektion, b*infektion - (gamma + sigma)*I, gamma*I, sigma*I]
+    return np.concatenate([dy, ds.ravel()])
+
+
+def sird_sensitivitaet(parameter, umschaltzeiten, t, rtol=1e-8, atol=1e-12):
+    """Lösung des SIRD-Modells mit Lockdownphasen und deren Ableitungen
+    nach den Parametern aus den Vorwärts-Sensitivitätsgleichungen.
+
+    Parameter:
+        parameter: (beta, gamma, sigma, I_0, faktor_1, ..., faktor_P), I_0
+                   als Anteil; S_0 = 1 - I_0, R_0 = D_0 = 0
+        umschaltzeiten: Beginn der P Lockdownphasen (aufsteigend)
+        t: Ausgabezeitpunkte, beginnend beim Startzeitpunkt
+    Rückgabe:
+        y: Array der Form (len(t), 4) mit S, I, R, D
+        s: Array der Form (len(t), 4, Anzahl Parameter) mit dy/dp
+    """
+    beta, gamma, sigma, I_0 = parameter[:4]
+    faktoren = np.asarray(parameter[4:], dtype=float)
+    umschaltzeiten = np.asarray(umschaltzeiten, dtype=float)
+    anzahl = len(parameter)
+    z_0 = np.zeros(4 + 4*anzahl)
+    z_0[:4] = 1.0 - I_0, I_0, 0.0, 0.0
+    #Ableitung der Anfangswerte nach I_0
+    z_0[4 + 3] = -1.0
+    z_0[4 + anzahl + 3] = 1.0
+    Z = _loese_phasenweise(
+        _sensitivitaet_sys, z_0, t, umschaltzeiten,
+        lambda t_a: (beta, gamma, sigma, faktoren,
+                     np.sum(umschaltzeiten <= t_a)), rtol, atol)
+    return Z[:, :4], Z[:, 4:].reshape(len(t), 4, anzahl)
+
+
+def sird_fit(tage, faelle, tote, N, umschaltzeiten=(), start=None):
+    """Anpassung von beta, gamma, sigma, dem Anfangsanteil der Infizierten
+    I_0 und den Faktoren der Lockdownphasen an tägliche Fall- und
+    Todeszahlen.
+
+    Modell: neue Fälle zwischen zwei Meldetagen N*(S(t_vorher) - S(t)),
+    neue Tote N*(D(t) - D(t_vorher)), Start einen Tag vor dem ersten
+    Meldetag. Minimiert wird die Summe der quadrierten Residuen
+    2*(sqrt(Beobachtung) - sqrt(Modell)), die für poissonverteilte Zahlen
+    näherungsweise Varianz 1 besitzen. Die Jacobi-Matrix stammt aus den
+    Vorwärts-Sensitivitätsgleichungen (sird_sensitivitaet), die Parameter
+    werden logarithmisch angepasst und bleiben damit positiv.
+
+    Parameter:
+        tage, faelle, tote: Meldetage (aufsteigend) und Zahlen
+        N: Gesamtpopulation
+        umschaltzeiten: Beginn der Lockdownphasen (in Tagen wie tage),
+                        für jede wird ein eigener Faktor für beta angepasst
+        start: optional Startwerte (beta, gamma, sigma, I_0, faktoren...)
+    Rückgabe: Dictionary mit
+        parameter: angepasste Parameter in der Reihenfolge von start
+        standardfehler: aus der Kovarianzmatrix (J^T J)^(-1)
+        beta, gamma, sigma, I_0: einzelne Parameter
+        plan: Lockdownplan mit den angepassten Faktoren
+        t, faelle_modell, tote_modell: Modellwerte an den Meldetagen
+        ergebnis: Ergebnis von scipy.optimize.least_squares
+    """
+    tage = np.asarray(tage, dtype=float)
+    beobachtet = np.concatenate([faelle, tote]).astype(float)
+    umschaltzeiten = np.asarray(umschaltzeiten, dtype=float)
+    t = np.concatenate([[tage[0] - 1.0], tage])
+    if start is None:
+        gamma_0 = 0.1
+        sigma_0 = gamma_0*max(np.sum(tote), 1.0)/max(np.sum(faelle), 1.0)
+        start = np.concatenate([[0.3, gamma_0, sigma_0,
+                                 max(faelle[0], 1.0)/N],
+                                np.ones(len(umschaltzeiten))])
+
+    letztes = {}
+
+    def modell(x):
+        #least_squares ruft residuen und jacobi mit demselben x auf, die
+        #Sensitivitätsgleichungen liefern beides in einer Integration
+        if letztes.get('x') is not None and np.array_equal(letztes['x'], x):
+            return letztes['werte'], letztes['ableitung']
+        parameter = np.exp(x)
+        y, s = sird_sensitivitaet(parameter, umschaltzeiten, t)
+        werte = N*np.concatenate([-np.diff(y[:, 0]), np.diff(y[:, 3])])
+        #Ableitung nach log(p) = Ableitung nach p mal p
+        ableitung = N*np.concatenate([-np.diff(s[:, 0], axis=0),
+                                      np.diff(s[:, 3], axis=0)])*parameter
+        letztes.update(x=x.copy(), werte=np.maximum(werte, 1e-12),
+                       ableitung=ableitung)
+        return letztes['werte'], ableitung
+
+    def residuen(x):
+        werte, ableitung = modell(x)
+        return 2.0*(np.sqrt(beobachtet) - np.sqrt(werte))
+
+    def jacobi(x):
+        werte, ableitung = modell(x)
+        return -ableitung/np.sqrt(werte)[:, None]
+
+    ergebnis = least_squares(residuen, np.log(start), jac=jacobi,
+                             method='lm')
+    parameter = np.exp(ergebnis.x)
+    kovarianz = np.linalg.pinv(ergebnis.jac.T @ ergebnis.jac)
+    werte, ableitung = modell(ergebnis.x)
+    return {'parameter': parameter,
+            'standardfehler': parameter*np.sqrt(np.diag(kovarianz)),
+            'beta': parameter[0], 'gamma': parameter[1],
+            'sigma': parameter[2], 'I_0': parameter[3],
+            'plan': Lockdownplan(zip(umschaltzeiten, parameter[4:])),
+            't': tage, 'faelle_modell': werte[:len(tage)],
+            'tote_modell': werte[len(tage):], 'ergebnis': ergebnis}
+
+
+def _fit_einzeln(argumente):
+    """sird_fit für ein Tupel (tage, faelle, tote, N, umschaltzeiten) ohne
+    das Ergebnisobjekt von least_squares (für den Prozesspool)."""
+    ergebnis = sird_fit(*argumente)
+    del ergebnis['ergebnis']
+    return ergebnis
+
+
+def sird_fit_viele(serien, prozesse=None):
+    """Anpassung vieler Zeitreihen (z.B. Regionen) auf mehreren Prozessen.
+
+    serien: Liste von Tupeln (tage, faelle, tote, N, umschaltzeiten)
+    Rückgabe: Liste der Ergebnisse von sird_fit in derselben Reihenfolge
+    """
+    with ProcessPoolExecutor(max_workers=prozesse) as pool:
+        return list(pool.map(_fit_einzeln, serien, chunksize=8))